@@ -5,13 +5,30 @@
 # data and provides it in several different ways:
 #
 #    1. Makes periodic updates to a log file stocklog.dat
+#    2. Hands records to observers, optionally in batches from
+#       background threads (BackgroundObserver)
+#    3. Publishes the log lines to subscribers over a socket (FeedServer)
 #
 # The purpose of this module is to provide data to the user
 # in different ways in order to write interesting Python examples
 
+import array
+import collections
+import csv
 import math
+import os
+import selectors
+import socket
+import stat
+import struct
 import time
 import threading
+import traceback
+from bisect import bisect_right
+try:
+    import numpy as np
+except ImportError:
+    np = None
 try:
     import queue
 except ImportError:
@@ -39,16 +56,117 @@ def minutes_to_str(m):
     seconds = frac * 60
     return "%02d:%02d.%02.f" % (hours,minutes,seconds)
 
-# Read the stock history file as a list of lists
-def read_history(filename):
+# Read the stock history file as a list of lists:
+#
+#    [name, price, date, minutes, change, open, high, low, volume]
+#
+# The parsed history is cached in a binary file next to the source
+# (filename + '.histcache'), which is used as long as the source file's
+# modification time and size haven't changed.
+def read_history(filename,cache=True):
+    if not cache:
+        return _parse_history(filename)
+    # Taken before parsing, so that if the file changes meanwhile the
+    # cache is saved under the old key and won't be used
+    key = _cache_key(filename)
+    result = _load_history_cache(filename,key)
+    if result is None:
+        result = _parse_history(filename)
+        _save_history_cache(filename,key,result)
+    return result
+
+def _parse_history(filename):
     result = []
-    for line in open(filename):
-        str_fields = line.strip().split(",")
-        fields = [eval(x) for x in str_fields]
-        fields[3] = minutes(fields[3])
-        result.append(fields)
+    with open(filename, newline='') as f:
+        for row in csv.reader(f):
+            if not row:
+                continue
+            name, price, date, tm, change, open_, high, low, volume = row
+            result.append([name, float(price), date, minutes(tm), float(change),
+                           float(open_), float(high), float(low), int(volume)])
     return result
 
+# History cache layout: a header, the distinct strings (names and dates)
+# and then one array per column, with strings stored as indices.
+_cache_header = struct.Struct('<4sIqqII')    # magic, version, mtime_ns, size, rows, strings bytes
+_cache_magic = b'STKH'
+_cache_version = 1
+_cache_columns = 'idiiddddq'
+_cache_row_size = sum(array.array(code).itemsize for code in _cache_columns)
+
+def _cache_key(filename):
+    st = os.stat(filename)
+    return st.st_mtime_ns, st.st_size
+
+def _load_history_cache(filename,key):
+    try:
+        with open(filename + '.histcache', 'rb') as f:
+            data = f.read()
+        magic, version, mtime_ns, size, nrows, nstrings = _cache_header.unpack_from(data)
+    except (OSError, struct.error):
+        return None
+    if (magic, version) != (_cache_magic, _cache_version) or (mtime_ns, size) != key:
+        return None
+    if len(data) != _cache_header.size + nstrings + nrows*_cache_row_size:
+        return None                     # Truncated or otherwise damaged
+
+    offset = _cache_header.size
+    try:
+        strings = data[offset:offset+nstrings].decode().split('\n')
+    except UnicodeDecodeError:
+        return None
+    offset += nstrings
+    columns = []
+    for code in _cache_columns:
+        column = array.array(code)
+        nbytes = nrows * column.itemsize
+        column.frombytes(data[offset:offset+nbytes])
+        offset += nbytes
+        columns.append(column.tolist())
+    try:
+        columns[0] = list(map(strings.__getitem__, columns[0]))
+        columns[2] = list(map(strings.__getitem__, columns[2]))
+    except IndexError:
+        return None
+    return list(map(list, zip(*columns)))
+
+def _save_history_cache(filename,key,history):
+    strings = { }
+    for rec in history:
+        strings.setdefault(rec[0], len(strings))
+        strings.setdefault(rec[2], len(strings))
+    columns = [ array.array(code) for code in _cache_columns ]
+    for rec in history:
+        row = list(rec)
+        row[0] = strings[row[0]]
+        row[2] = strings[row[2]]
+        for column, value in zip(columns, row):
+            column.append(value)
+    string_data = '\n'.join(strings).encode()
+
+    # Write to a temporary file and rename, so a reader never sees a
+    # partial cache.  Failing to write the cache isn't an error.
+    tmpname = '%s.histcache.%d' % (filename, os.getpid())
+    try:
+        with open(tmpname, 'wb') as f:
+            f.write(_cache_header.pack(_cache_magic, _cache_version, *key,
+                                       len(history), len(string_data)))
+            f.write(string_data)
+            for column in columns:
+                column.tofile(f)
+        os.replace(tmpname, filename + '.histcache')
+    except OSError:
+        try:
+            os.remove(tmpname)
+        except OSError:
+            pass
+
+# Slope between each pair of consecutive (time, value) points.  Points
+# at the same time get a slope of 0 (the first value is used).
+def slopes(times, values):
+    return [ (v1 - v0)/(t1 - t0) if t1 != t0 else 0
+             for t0, t1, v0, v1 in zip(times, times[1:], values, values[1:]) ]
+
 # Format CSV record
 def csv_record(fields):
     s = '"%s",%0.2f,"%s","%s",%0.2f,%0.2f,%0.2f,%0.2f,%d' % tuple(fields)
@@ -74,12 +192,15 @@ class StockTrack(object):
         self.time = time
         # Sort the history by time
         self.history.sort(key=lambda t:t[3])
+        # Columns of the history and the slope between each pair of
+        # entries, used for interpolation
+        self.times = [ rec[3] for rec in self.history ]
+        self.prices = [ rec[1] for rec in self.history ]
+        self.volumes = [ rec[-1] for rec in self.history ]
+        self.price_slopes = slopes(self.times, self.prices)
+        self.volume_slopes = slopes(self.times, self.volumes)
         # Find the first entry who's time is behind the given time
-        self.index = 0
-        while self.index < len(self.history):
-            if self.history[self.index][3] > time:
-                break
-            self.index += 1
+        self.index = bisect_right(self.times, time)
         self.open = self.history[0][5]
         self.initial = self.history[0][1] - self.history[0][4]
         self.date = self.history[0][2]
@@ -87,23 +208,14 @@ class StockTrack(object):
         self.low = self.price
         self.high = self.price
 
-    # Calculate interpolated value of a given field based on
-    # current time
-    def interpolate(self,field):
-        first = self.history[self.index][field]
-        next  = self.history[self.index+1][field]
-        first_t = self.history[self.index][3]
-        next_t = self.history[self.index+1][3]
-        try:
-            slope = (next - first)/(next_t-first_t)
-            return first + slope*(self.time - first_t)
-        except ZeroDivisionError:
-            return first
+    # Calculate interpolated value of a column based on current time
+    def interpolate(self,values,slopes):
+        return values[self.index] + slopes[self.index]*(self.time - self.times[self.index])
 
     # Update all computed values
     def update(self):
-        self.price = round(self.interpolate(1),2)
-        self.volume = int(self.interpolate(-1))
+        self.price = round(self.interpolate(self.prices, self.price_slopes),2)
+        self.volume = int(self.interpolate(self.volumes, self.volume_slopes))
         if self.price < self.low:
             self.low = self.price
         if self.price >= self.high:
@@ -113,29 +225,149 @@ class StockTrack(object):
     # Increment the time by a delta
     def incr(self,dt):
         self.time += dt
-        if self.index < (len(self.history) - 2):
-            while self.index < (len(self.history) - 2) and self.time >= self.history[self.index+1][3]:
-                self.index += 1
+        times = self.times
+        last = len(times) - 2
+        while self.index < last and self.time >= times[self.index+1]:
+            self.index += 1
         self.update()
 
     def make_record(self):
         return [self.name,round(self.price,2),self.date,minutes_to_str(self.time),round(self.change,2),self.open,round(self.high,2),
                 round(self.low,2),self.volume]
 
+class TrackArrays(object):
+    '''
+    The interpolation state of a list of StockTracks held in NumPy arrays,
+    so that one tick updates every stock at once.  Gives the same results
+    as calling incr() on each StockTrack.
+    '''
+    def __init__(self,tracks,time):
+        self.tracks = tracks
+        self.time = time
+        lengths = np.array([ len(t.times) for t in tracks ])
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        self.last = starts + lengths - 2
+        self.pos = starts + np.array([ t.index for t in tracks ])
+        self.times = np.concatenate([ t.times for t in tracks ])
+        self.prices = np.concatenate([ t.prices for t in tracks ])
+        self.volumes = np.concatenate([ t.volumes for t in tracks ])
+        # Slope tables padded to line up with the other columns
+        self.price_slopes = np.concatenate([ t.price_slopes + [0] for t in tracks ])
+        self.volume_slopes = np.concatenate([ t.volume_slopes + [0] for t in tracks ])
+        self.price = np.array([ t.price for t in tracks ])
+        self.low = np.array([ t.low for t in tracks ])
+        self.high = np.array([ t.high for t in tracks ])
+        self.initial = np.array([ t.initial for t in tracks ])
+
+    def incr(self,dt):
+        '''
+        Advance every stock by dt minutes.  Returns the positions of the
+        tracks whose price changed, with their attributes brought up to
+        date.  (Attributes of the other tracks aren't kept current.)
+        '''
+        self.time += dt
+        # Move past history entries whose time has been reached
+        while True:
+            move = (self.pos < self.last) & (self.times[np.minimum(self.pos + 1, len(self.times) - 1)] <= self.time)
+            if not move.any():
+                break
+            self.pos += move
+        offset = self.time - self.times[self.pos]
+        price = round2(self.prices[self.pos] + self.price_slopes[self.pos]*offset)
+        volume = (self.volumes[self.pos] + self.volume_slopes[self.pos]*offset).astype(np.int64)
+        np.minimum(self.low, price, out=self.low)
+        np.maximum(self.high, price, out=self.high)
+        changed = np.flatnonzero(price != self.price)
+        self.price = price
+
+        for n in changed.tolist():
+            track = self.tracks[n]
+            track.time = self.time
+            track.index = int(self.pos[n])
+            track.price = float(price[n])
+            track.volume = int(volume[n])
+            track.low = float(self.low[n])
+            track.high = float(self.high[n])
+            track.change = track.price - track.initial
+        return changed
+
+# Round an array to 2 decimals exactly like round(x, 2).  NumPy rounds
+# x*100 to the nearest integer, but x*100 may come out as an exact half
+# only because the product was rounded.  Those ties are broken using the
+# rounding error of the product (Dekker's two-product algorithm).
+def round2(values):
+    scaled = values * 100
+    result = np.rint(scaled)
+    half = np.flatnonzero(scaled - np.floor(scaled) == 0.5)
+    if len(half):
+        x = values[half]
+        p = scaled[half]
+        t = 134217729.0 * x             # Split x into 26 bit halves
+        hi = t - (t - x)
+        lo = x - hi
+        err = (hi*100 - p) + lo*100     # x*100 == p + err exactly
+        result[half] = np.where(err > 0, np.ceil(p), np.where(err < 0, np.floor(p), result[half]))
+    return result / 100
+
 class MarketSimulator(object):
     def __init__(self):
         self.stocks = { }
         self.prices = { }
         self.time = 0
         self.observers = []
-    def register(self,observer):
+        self.arrays = None
+    # Add an observer.  With background=True, records are handed to it
+    # in batches by a thread of its own (see BackgroundObserver for the
+    # options), so a slow observer doesn't hold up the market.
+    def register(self,observer,background=False,**options):
+        if background:
+            observer = BackgroundObserver(observer,**options)
         self.observers.append(observer)
+        return observer
+
+    # Wait until the background observers have caught up
+    def flush(self):
+        for obj in self.observers:
+            if hasattr(obj, 'flush'):
+                obj.flush()
+
+    # Write out anything pending and stop the background observers
+    def close(self):
+        for obj in self.observers:
+            if hasattr(obj, 'close'):
+                obj.close()
+
+    # Return {name: metrics} for each background observer
+    def metrics(self):
+        result = { }
+        for obj in self.observers:
+            if isinstance(obj, BackgroundObserver):
+                name = obj.name
+                n = 1
+                while name in result:
+                    n += 1
+                    name = '%s-%d' % (obj.name, n)
+                result[name] = obj.metrics()
+        return result
 
     def publish(self,record):
         for obj in self.observers:
             obj.update(record)
+
+    # Send a list of records to every observer.  Observers with an
+    # update_batch() method get the whole list in one call.
+    def publish_batch(self,records):
+        for obj in self.observers:
+            if hasattr(obj, 'update_batch'):
+                obj.update_batch(records)
+            else:
+                for record in records:
+                    obj.update(record)
+
     def add_history(self,filename):
-        hist = read_history(filename)
+        self.add_records(read_history(filename))
+
+    def add_records(self,hist):
         for record in hist:
             if record[0] not in self.stocks:
                 self.stocks[record[0]] = StockTrack(record[0])
@@ -145,25 +377,361 @@ class MarketSimulator(object):
         self.time = time
         for s in list(self.stocks.values()):
             s.reset(time)
+        if np and self.stocks:
+            self.arrays = TrackArrays(list(self.stocks.values()), time)
+
+    # Advance every stock by dt minutes and return the records of the
+    # stocks whose price changed
+    def incr(self,dt):
+        if self.arrays:
+            tracks = self.arrays.tracks
+            changed = [ tracks[n] for n in self.arrays.incr(dt) ]
+        else:
+            changed = []
+            for track in self.stocks.values():
+                track.incr(dt)
+                if track.price != self.prices[track.name]:
+                    changed.append(track)
+        records = []
+        for track in changed:
+            self.prices[track.name] = track.price
+            records.append(track.make_record())
+        return records
 
-    # Run forever.  Dt is in seconds
-    def run(self,dt):
+    # Run until the end time (in minutes).  dt is the simulated time of
+    # each tick in seconds.  Ticks are paced at speed times real time, or
+    # as fast as possible if speed is None.  The records are the same
+    # whatever the speed.
+    def run(self,dt,speed=1.0,end=1000):
+        records = []
         for s in self.stocks:
             self.prices[s] = self.stocks[s].price
-            self.publish(self.stocks[s].make_record())
-        while self.time < 1000:
-            for s in self.stocks:
-                self.stocks[s].incr(dt/60.0)    # Increment is in minutes
-                if self.stocks[s].price != self.prices[s]:
-                    self.prices[s] = self.stocks[s].price
-                    self.publish(self.stocks[s].make_record())
-            time.sleep(dt)
+            records.append(self.stocks[s].make_record())
+        self.publish_batch(records)
+        start = time.monotonic()
+        ticks = 0
+        while self.time < end:
+            records = self.incr(dt/60.0)    # Increment is in minutes
+            if records:
+                self.publish_batch(records)
+            ticks += 1
+            if speed:
+                # Sleep until this tick is due, so that time spent working
+                # doesn't slow the simulation down
+                delay = start + ticks*dt/speed - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
             self.time += (dt/60.0)
+        self.flush()
+
+# Make a larger market for load testing: each stock in the history is
+# copied n times under new names (e.g. IBM_1, IBM_2, ...) with its prices
+# scaled a little, so the copies don't move in lockstep.
+def synthetic_history(hist,n):
+    result = []
+    for k in range(1, n+1):
+        scale = 1 + k/1000
+        for rec in hist:
+            rec = list(rec)
+            rec[0] = '%s_%d' % (rec[0], k)
+            for i in (1, 4, 5, 6, 7):
+                rec[i] = round(rec[i]*scale, 2)
+            result.append(rec)
+    return result
+
+# Observer wrapper that queues records and sends them to the observer
+# in batches from a background thread.  A batch is sent once batch_size
+# records are waiting, or when the oldest has waited flush_interval
+# seconds.  If more than maxsize records are waiting, publishing either
+# blocks until the writer catches up (overflow='block') or the new
+# records are dropped (overflow='drop').
+class BackgroundObserver(object):
+    def __init__(self,observer,batch_size=1000,flush_interval=0.1,
+                 maxsize=100000,overflow='block',name=None):
+        if overflow not in ('block', 'drop'):
+            raise ValueError("overflow must be 'block' or 'drop'")
+        self.observer = observer
+        self.name = name or type(observer).__name__
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.maxsize = maxsize
+        self.overflow = overflow
+        self.pending = collections.deque()      # (time published, records)
+        self.npending = 0
+        self.writing = False
+        self.closed = False
+        self.cond = threading.Condition()
+        self.published = self.written = self.dropped = self.batches = 0
+        self.last_lag = self.max_lag = 0.0
+        self.thread = threading.Thread(target=self._writer, name=self.name, daemon=True)
+        self.thread.start()
+
+    def update(self,record):
+        self.update_batch([record])
+
+    def update_batch(self,records):
+        with self.cond:
+            if self.closed:
+                raise RuntimeError('%s is closed' % self.name)
+            self.published += len(records)
+            if self.overflow == 'block':
+                while self.npending >= self.maxsize and not self.closed:
+                    self.cond.wait()
+                if self.closed:
+                    raise RuntimeError('%s is closed' % self.name)
+            elif self.npending + len(records) > self.maxsize:
+                keep = max(self.maxsize - self.npending, 0)
+                self.dropped += len(records) - keep
+                records = records[:keep]
+            if records:
+                self.pending.append((time.monotonic(), list(records)))
+                self.npending += len(records)
+                if self.npending >= self.batch_size or len(self.pending) == 1:
+                    self.cond.notify_all()
+
+    def _next_batch(self):
+        with self.cond:
+            while True:
+                if self.pending:
+                    if self.closed or self.npending >= self.batch_size:
+                        break
+                    wait = self.pending[0][0] + self.flush_interval - time.monotonic()
+                    if wait <= 0:
+                        break
+                elif self.closed:
+                    return None, None
+                else:
+                    wait = None
+                self.cond.wait(wait)
+            published = self.pending[0][0]
+            batch = []
+            while self.pending and len(batch) < self.batch_size:
+                batch.extend(self.pending.popleft()[1])
+            self.npending -= len(batch)
+            self.writing = True
+            self.cond.notify_all()
+            return published, batch
+
+    def _writer(self):
+        while True:
+            published, batch = self._next_batch()
+            if batch is None:
+                return
+            try:
+                if hasattr(self.observer, 'update_batch'):
+                    self.observer.update_batch(batch)
+                else:
+                    for record in batch:
+                        self.observer.update(record)
+            except Exception:
+                traceback.print_exc()
+            lag = time.monotonic() - published
+            with self.cond:
+                self.written += len(batch)
+                self.batches += 1
+                self.last_lag = lag
+                self.max_lag = max(self.max_lag, lag)
+                self.writing = False
+                self.cond.notify_all()
+
+    # Wait until everything published so far has been written
+    def flush(self):
+        with self.cond:
+            while self.pending or self.writing:
+                self.cond.wait()
+
+    def close(self):
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        self.thread.join()
+        if hasattr(self.observer, 'close'):
+            self.observer.close()
+
+    # Counts of records published, written, dropped and waiting, and the
+    # lag in seconds from publishing to written: for the last batch, the
+    # most seen, and how long the oldest waiting record has waited.
+    def metrics(self):
+        with self.cond:
+            return { 'published': self.published,
+                     'written': self.written,
+                     'dropped': self.dropped,
+                     'pending': self.npending,
+                     'batches': self.batches,
+                     'lag': self.last_lag,
+                     'max_lag': self.max_lag,
+                     'oldest': time.monotonic() - self.pending[0][0] if self.pending else 0.0 }
+
+# Observer that publishes records as CSV lines to subscribers connected
+# over TCP (address is a (host, port) tuple) or a Unix socket (address
+# is a path).  Subscribers get the lines published after they connect,
+# just like following the end of the log file.  Each subscriber has its
+# own buffer for lines it hasn't read yet, and one that falls more than
+# max_buffer bytes behind is disconnected so it can't hold up the rest.
+# All of the socket I/O is done by a thread of the server's own.
+class FeedServer(object):
+    def __init__(self,address,max_buffer=1<<20):
+        if isinstance(address, str):
+            if os.path.exists(address) and stat.S_ISSOCK(os.stat(address).st_mode):
+                os.remove(address)          # Left over from an earlier run
+            self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        else:
+            self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+            self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self.sock.bind(address)
+        self.sock.listen(socket.SOMAXCONN)
+        self.sock.setblocking(False)
+        self.address = self.sock.getsockname()
+        self.max_buffer = max_buffer
+        self.subscribers = { }          # socket -> FeedSubscriber
+        self.disconnected = 0           # Slow subscribers disconnected
+
+        # Records are handed to the server thread through outgoing, and
+        # a byte sent on the wakeup socket tells it there's something there
+        self.outgoing = [ ]
+        self.lock = threading.Lock()
+        self.wakeup, self.waker = socket.socketpair()
+        self.wakeup.setblocking(False)
+        self.waker.setblocking(False)
+        self.closed = False
 
+        self.selector = selectors.DefaultSelector()
+        self.selector.register(self.sock, selectors.EVENT_READ)
+        self.selector.register(self.wakeup, selectors.EVENT_READ)
+        self.thread = threading.Thread(target=self._serve, name='FeedServer', daemon=True)
+        self.thread.start()
+
+    def update(self,record):
+        self.update_batch([record])
+
+    def update_batch(self,records):
+        data = ''.join(csv_record(r)+"\n" for r in records).encode()
+        with self.lock:
+            if self.closed:
+                raise RuntimeError('FeedServer is closed')
+            self.outgoing.append(data)
+            if len(self.outgoing) > 1:
+                return                      # Already woken up
+        self._wake()
+
+    def _wake(self):
+        try:
+            self.waker.send(b'\0')
+        except BlockingIOError:
+            pass
+
+    def _serve(self):
+        while True:
+            for key, events in self.selector.select():
+                if key.fileobj is self.sock:
+                    self._accept()
+                elif key.fileobj is self.wakeup:
+                    while True:
+                        try:
+                            self.wakeup.recv(4096)
+                        except BlockingIOError:
+                            break
+                    with self.lock:
+                        data = b''.join(self.outgoing)
+                        self.outgoing = [ ]
+                        closed = self.closed
+                    if data:
+                        for sub in list(self.subscribers.values()):
+                            self._queue(sub, data)
+                    if closed:
+                        self._shutdown()
+                        return
+                else:
+                    sub = key.data
+                    if sub.sock not in self.subscribers:
+                        continue                # Dropped earlier in this loop
+                    if events & selectors.EVENT_READ:
+                        # Subscribers don't send anything, so this is a close
+                        try:
+                            data = sub.sock.recv(4096)
+                        except OSError:
+                            data = b''
+                        if not data:
+                            self._drop(sub)
+                            continue
+                    if events & selectors.EVENT_WRITE:
+                        self._send(sub)
+
+    def _accept(self):
+        try:
+            client, address = self.sock.accept()
+        except (BlockingIOError, ConnectionError):
+            return
+        client.setblocking(False)
+        sub = self.subscribers[client] = FeedSubscriber(client, address)
+        self.selector.register(client, selectors.EVENT_READ, sub)
+
+    def _queue(self,sub,data):
+        sub.buffer += data
+        if len(sub.buffer) > self.max_buffer:
+            self.disconnected += 1
+            self._drop(sub)
+        else:
+            self._send(sub)
+
+    def _send(self,sub):
+        try:
+            n = sub.sock.send(sub.buffer)
+        except BlockingIOError:
+            n = 0
+        except OSError:
+            self._drop(sub)
+            return
+        del sub.buffer[:n]
+        sub.sent += n
+        writing = bool(sub.buffer)
+        if writing != sub.writing:
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if writing else 0)
+            self.selector.modify(sub.sock, events, sub)
+            sub.writing = writing
+
+    def _drop(self,sub):
+        if self.subscribers.pop(sub.sock, None) is None:
+            return                          # Already gone
+        self.selector.unregister(sub.sock)
+        sub.sock.close()
+
+    def _shutdown(self):
+        # Give each subscriber what it's owed, as far as it can take it
+        # without blocking, then close everything
+        for sub in list(self.subscribers.values()):
+            if sub.buffer:
+                self._send(sub)
+            self._drop(sub)
+        self.selector.close()
+        self.sock.close()
+        if isinstance(self.address, str):
+            os.remove(self.address)
+        self.wakeup.close()
+        self.waker.close()
+
+    def close(self):
+        with self.lock:
+            if self.closed:
+                return
+            self.closed = True
+        self._wake()
+        self.thread.join()
+
+class FeedSubscriber(object):
+    __slots__ = ('sock', 'address', 'buffer', 'sent', 'writing')
+    def __init__(self,sock,address):
+        self.sock = sock
+        self.address = address
+        self.buffer = bytearray()       # Data not sent yet
+        self.sent = 0                   # Bytes sent
+        self.writing = False            # Waiting for the socket to be writable
 
 class BasicPrinter(object):
     def update(self,record):
         print(csv_record(record))
+    def update_batch(self,records):
+        print('\n'.join(csv_record(r) for r in records))
 
 class LogPrinter(object):
     def __init__(self,filename):
@@ -171,13 +739,53 @@ class LogPrinter(object):
     def update(self,record):
         self.f.write(csv_record(record)+"\n")
         self.f.flush()
+    def update_batch(self,records):
+        self.f.write(''.join(csv_record(r)+"\n" for r in records))
+        self.f.flush()
+    def close(self):
+        self.f.close()
 
-m = MarketSimulator()
-m.add_history(history_file)
-m.reset(minutes("9:30am"))
-m.register(BasicPrinter())
-m.register(LogPrinter("stocklog.csv"))
-m.run(1)
-
+if __name__ == '__main__':
+    import argparse
+    import sys
+    parser = argparse.ArgumentParser(description='Stock market simulator')
+    parser.add_argument('--speed', default='1',
+                        help="times real time, or 'max' to run as fast as possible")
+    parser.add_argument('--start', default='9:30am', help='start time (e.g. 9:30am)')
+    parser.add_argument('--end', default=None, help='end time (e.g. 4:00pm)')
+    parser.add_argument('--dt', type=float, default=1, help='seconds per tick')
+    parser.add_argument('--log', default='stocklog.csv', help='log file to write')
+    parser.add_argument('--quiet', action='store_true', help="don't print records")
+    parser.add_argument('--synthetic', type=int, default=0,
+                        help='add this many synthetic copies of every stock')
+    parser.add_argument('--feed', default=None,
+                        help='serve the log lines on host:port or a Unix socket path')
+    parser.add_argument('--background', action='store_true',
+                        help='write records from background threads')
+    parser.add_argument('--overflow', choices=['block', 'drop'], default='block',
+                        help='what a background writer that falls behind does')
+    args = parser.parse_args()
 
-   
+    m = MarketSimulator()
+    hist = read_history(history_file)
+    m.add_records(hist)
+    m.add_records(synthetic_history(hist, args.synthetic))
+    m.reset(minutes(args.start))
+    options = { }
+    if args.background:
+        options = dict(background=True, overflow=args.overflow)
+    if not args.quiet:
+        m.register(BasicPrinter(), **options)
+    m.register(LogPrinter(args.log), **options)
+    if args.feed:
+        host, sep, port = args.feed.rpartition(':')
+        m.register(FeedServer((host or 'localhost', int(port)) if sep else args.feed))
+    try:
+        m.run(args.dt,
+              speed=None if args.speed == 'max' else float(args.speed),
+              end=minutes(args.end) if args.end else 1000)
+    finally:
+        m.close()
+        for name, stats in m.metrics().items():
+            sys.stderr.write('%s: %d written, %d dropped, max lag %.3fs\n' %
+                             (name, stats['written'], stats['dropped'], stats['max_lag']))
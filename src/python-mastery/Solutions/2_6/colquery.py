@@ -0,0 +1,245 @@
+# colquery.py
+#
+# Batched queries over column oriented data such as the DataCollection
+# made by colreader.py.  Columns are integer coded once and then every
+# query (distinct, group-by-sum, lookup) runs as a bulk operation on the
+# codes.  NumPy is used if it's installed, otherwise array/itertools.
+
+import collections
+import operator
+from array import array
+from itertools import compress
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+class Query:
+    '''
+    Query engine over a DataCollection or a dict of columns
+    (e.g. dict(route=rides.routes, ...) for a RideData).
+    '''
+    def __init__(self, data):
+        if isinstance(data, collections.abc.Mapping):
+            self.columns = dict(data)
+        else:
+            self.columns = dict(zip(data.column_names, data.column_data))
+        self._codes = { }       # name -> (codes, {value: code})
+        self._numbers = { }     # name -> numeric column
+
+    def encode(self, name):
+        '''
+        Return (codes, index) for a column.  index maps each distinct value
+        to its code, with codes assigned in order of first appearance.
+        '''
+        if name not in self._codes:
+            column = self.columns[name]
+            index = { val: code for code, val in enumerate(dict.fromkeys(column)) }
+            codes = map(index.__getitem__, column)
+            if np:
+                codes = np.fromiter(codes, dtype=np.intp, count=len(column))
+            else:
+                codes = array('i', codes)
+            self._codes[name] = (codes, index)
+        return self._codes[name]
+
+    def derive(self, name, func, source):
+        '''
+        Add a coded column computed as func(value) of another column.
+        func is only called once per distinct value.
+        '''
+        codes, index = self.encode(source)
+        derived = { }
+        mapping = [ derived.setdefault(func(val), len(derived)) for val in index ]
+        if np:
+            newcodes = np.array(mapping, dtype=np.intp)[codes]
+        else:
+            newcodes = array('i', map(mapping.__getitem__, codes))
+        self._codes[name] = (newcodes, derived)
+
+    def distinct(self, name):
+        '''
+        Return the distinct values of a column in order of first appearance
+        '''
+        return list(self.encode(name)[1])
+
+    def sum_by(self, keys, value, where=None):
+        '''
+        Total the value column grouped by one or more key columns.  Returns
+        a Counter identical to adding the values up row by row, optionally
+        restricted to rows matching the where={name: value} filters.
+        '''
+        if isinstance(keys, str):
+            keys = (keys,)
+        encoded = [ self.encode(name) for name in keys ]
+
+        # Combine the key columns into a single integer code
+        combined = encoded[0][0]
+        size = len(encoded[0][1])
+        for codes, index in encoded[1:]:
+            size *= len(index)
+            if np:
+                combined = combined * len(index) + codes
+            else:
+                combined = [ k * len(index) + c for k, c in zip(combined, codes) ]
+
+        values = self._numeric(value)
+        mask = self._mask(where)
+        if np:
+            if mask is not None:
+                combined = combined[mask]
+                values = values[mask]
+            groups, sums = _np_sum_by(combined, values, size)
+        else:
+            if mask is not None:
+                combined = list(compress(combined, mask))
+                values = compress(values, mask)
+            totals = dict.fromkeys(combined, 0)
+            for k, val in zip(combined, values):
+                totals[k] += val
+            groups = list(totals)
+            sums = list(totals.values())
+
+        # Decode the combined codes back into key values
+        decoders = [ list(index) for codes, index in encoded ]
+        result = collections.Counter()
+        for k, total in zip(groups, sums):
+            parts = [ ]
+            for decode in reversed(decoders):
+                k, code = divmod(k, len(decode))
+                parts.append(decode[code])
+            result[parts[0] if len(parts) == 1 else tuple(reversed(parts))] = total
+        return result
+
+    def lookup(self, value, **keys):
+        '''
+        Return the value column from the last row matching all of the given
+        key=value pairs, like a dict built with composite keys.
+        '''
+        mask = self._mask(keys)
+        column = self.columns[value]
+        if np:
+            rows = np.flatnonzero(mask)
+            if len(rows):
+                return column[rows[-1]]
+        else:
+            for n in reversed(range(len(mask))):
+                if mask[n]:
+                    return column[n]
+        raise KeyError(tuple(keys.values()))
+
+    def _numeric(self, name):
+        if name not in self._numbers:
+            column = self.columns[name]
+            self._numbers[name] = np.asarray(column) if np else column
+        return self._numbers[name]
+
+    def _mask(self, where):
+        '''
+        Row selector for a dict of equality filters (None if no filters)
+        '''
+        mask = None
+        for name, val in (where or {}).items():
+            codes, index = self.encode(name)
+            code = index.get(val, -1)
+            if np:
+                match = codes == code
+                mask = match if mask is None else mask & match
+            else:
+                match = map(code.__eq__, codes)
+                mask = list(match if mask is None else map(operator.and_, mask, match))
+        return mask
+
+def _np_sum_by(keys, values, size):
+    '''
+    Sum values grouped by integer keys in range(size).  Returns the keys
+    present and their totals, ordered by first appearance of each key.
+    '''
+    nrows = len(keys)
+    if size > 4 * nrows + 1024:
+        # Sparse keys. Sort them instead of using a dense table
+        groups, first, inverse = np.unique(keys, return_index=True, return_inverse=True)
+        sums = np.zeros(len(groups), dtype=values.dtype)
+        np.add.at(sums, inverse, values)
+    else:
+        counts = np.bincount(keys, minlength=size)
+        groups = np.flatnonzero(counts)
+        if values.dtype.kind in 'iu' and np.abs(values).sum(dtype=np.float64) >= 2**53:
+            # Float weights would lose precision
+            sums = np.zeros(size, dtype=values.dtype)
+            np.add.at(sums, keys, values)
+        else:
+            sums = np.bincount(keys, weights=values, minlength=size)
+            if values.dtype.kind in 'iu':
+                sums = sums.astype(np.int64)
+        sums = sums[groups]
+        # Row of first appearance.  When an index repeats in a fancy
+        # assignment the last value is kept, so assign in reverse.
+        first = np.empty(size, dtype=np.intp)
+        first[keys[::-1]] = np.arange(nrows - 1, -1, -1)
+        first = first[groups]
+    order = np.argsort(first, kind='stable')
+    return groups[order].tolist(), sums[order].tolist()
+
+if __name__ == '__main__':
+    # Answer the cta.py questions with Counters and with Query, check that
+    # the results agree and compare the times.
+    import sys
+    import time
+    from collections import defaultdict, Counter
+    import colreader
+
+    filename = sys.argv[1] if len(sys.argv) > 1 else '../../Data/ctabus.csv'
+    data = colreader.read_csv_as_columns(filename, [sys.intern, sys.intern, sys.intern, int])
+
+    def with_counters(rows):
+        routes = set()
+        for row in rows:
+            routes.add(row['route'])
+        by_route_date = { }
+        for row in rows:
+            by_route_date[row['route'], row['date']] = row['rides']
+        rides_per_route = Counter()
+        for row in rows:
+            rides_per_route[row['route']] += row['rides']
+        rides_by_year = defaultdict(Counter)
+        for row in rows:
+            year = row['date'].split('/')[2]
+            rides_by_year[year][row['route']] += row['rides']
+        diffs = rides_by_year['2011'] - rides_by_year['2001']
+        return (len(routes), by_route_date.get(('22', '02/02/2011')),
+                rides_per_route.most_common(), diffs.most_common(5))
+
+    def with_query(q):
+        try:
+            rides = q.lookup('rides', route='22', date='02/02/2011')
+        except KeyError:
+            rides = None
+        rides_per_route = q.sum_by('route', 'rides')
+        q.derive('year', lambda date: date.split('/')[2], 'date')
+        diffs = (q.sum_by('route', 'rides', where={'year': '2011'}) -
+                 q.sum_by('route', 'rides', where={'year': '2001'}))
+        return (len(q.distinct('route')), rides,
+                rides_per_route.most_common(), diffs.most_common(5))
+
+    rows = list(data)
+    start = time.perf_counter()
+    expected = with_counters(rows)
+    counter_time = time.perf_counter() - start
+
+    # Integer coding is a one-time cost shared by all queries
+    start = time.perf_counter()
+    q = Query(data)
+    q.encode('route')
+    q.encode('date')
+    encode_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    result = with_query(q)
+    query_time = time.perf_counter() - start
+
+    print('Results match:', result == expected)
+    print('Counters %0.3fs, Query %0.3fs (%s) + %0.3fs encoding, %0.1fx (%0.1fx with encoding)' %
+          (counter_time, query_time, 'numpy' if np else 'array', encode_time,
+           counter_time / query_time, counter_time / (query_time + encode_time)))
@@ -1,17 +1,225 @@
 # follow.py
 import os
 import time
-import csv
+import select
+import socket
+import struct
+import ctypes
+import ctypes.util
 
-def follow(filename):
+def follow(filename, *, batch=False, poll_interval=0.1, idle=None):
     '''
     Generator that produces a sequence of lines being written at the end of a file.
+
+    Everything appended since the last wakeup is read with a single read().
+    With batch=True, each wakeup produces one list of lines instead, and
+    if idle is given, an empty list is produced whenever nothing new has
+    arrived for idle seconds (so a consumer collecting batches can flush
+    on time).  The file is reopened if it's replaced (log rotation) and
+    read from the start again if it's truncated.
+    '''
+    f = open(filename, 'rb')
+    f.seek(0, os.SEEK_END)
+    watcher = _make_watcher(filename, poll_interval)
+    partial = b''
+    last = time.monotonic()
+    try:
+        while True:
+            data = f.read()
+            if data:
+                lines, partial = _split_lines(partial + data)
+            elif os.fstat(f.fileno()).st_size < f.tell():
+                # Truncated.  Start over from the beginning
+                f.seek(0)
+                partial = b''
+                continue
+            elif _replaced(f, filename):
+                try:
+                    newf = open(filename, 'rb')
+                except FileNotFoundError:
+                    watcher.wait()
+                    continue
+                # Rotated.  Finish off the old file, including an
+                # unterminated last line, and switch to the new one
+                lines, partial = _split_lines(partial + f.read())
+                if partial:
+                    lines.append(partial.decode())
+                    partial = b''
+                f.close()
+                f = newf
+            else:
+                if batch and idle is not None:
+                    wait = last + idle - time.monotonic()
+                    if wait <= 0:
+                        last = time.monotonic()
+                        yield []
+                        continue
+                    watcher.wait(wait)
+                else:
+                    watcher.wait()
+                continue
+
+            if not lines:
+                continue
+            last = time.monotonic()
+            if batch:
+                yield lines
+            else:
+                yield from lines
+    finally:
+        f.close()
+        watcher.close()
+
+def follow_socket(address, *, batch=False, idle=None, bufsize=65536):
+    '''
+    Generator that produces the lines sent by a feed server (such as
+    stocksim.py --feed) on a TCP (host, port) address or a Unix socket
+    path.  Lines, batches and idle are the same as for follow().  Stops
+    when the server closes the connection.
+    '''
+    family = socket.AF_UNIX if isinstance(address, str) else socket.AF_INET
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    partial = b''
+    try:
+        sock.connect(address)
+        if batch and idle is not None:
+            sock.settimeout(idle)
+        while True:
+            try:
+                data = sock.recv(bufsize)
+            except TimeoutError:
+                yield []
+                continue
+            if not data:
+                return
+            lines, partial = _split_lines(partial + data)
+            if not lines:
+                continue
+            if batch:
+                yield lines
+            else:
+                yield from lines
+    finally:
+        sock.close()
+
+def _split_lines(data):
+    '''
+    Split bytes into complete lines (str, with the newline).  Returns the
+    lines and the trailing bytes of an incomplete last line.
+    '''
+    end = data.rfind(b'\n') + 1
+    if not end:
+        return [], data
+    text = data[:end-1].decode()
+    return [ line + '\n' for line in text.split('\n') ], data[end:]
+
+def _replaced(f, filename):
+    '''
+    Check if filename now refers to a different file than the open file f
+    '''
+    try:
+        st = os.stat(filename)
+    except FileNotFoundError:
+        return False            # Removed, but the new file isn't there yet
+    fst = os.fstat(f.fileno())
+    return (st.st_ino, st.st_dev) != (fst.st_ino, fst.st_dev)
+
+def _make_watcher(filename, poll_interval):
+    try:
+        return _Inotify(filename)
+    except (OSError, AttributeError):
+        return _Poller(poll_interval)
+
+class _Poller:
+    '''
+    Fallback when inotify isn't available. Just sleep.
+    '''
+    def __init__(self, interval):
+        self.interval = interval
+
+    def wait(self, timeout=None):
+        time.sleep(self.interval if timeout is None else min(self.interval, timeout))
+
+    def close(self):
+        pass
+
+# inotify(7) constants
+IN_MODIFY      = 0x002
+IN_ATTRIB      = 0x004
+IN_CLOSE_WRITE = 0x008
+IN_MOVED_FROM  = 0x040
+IN_MOVED_TO    = 0x080
+IN_CREATE      = 0x100
+IN_DELETE      = 0x200
+IN_Q_OVERFLOW  = 0x4000
+IN_CLOEXEC     = 0o2000000
+
+_event = struct.Struct('iIII')        # wd, mask, cookie, len
+
+class _Inotify:
     '''
-    with open(filename,'r') as f:
-        f.seek(0,os.SEEK_END)
+    Block until the file (or a file replacing it) changes, using Linux
+    inotify through ctypes.  The directory is watched rather than the file
+    itself so that rotation and re-creation are seen too.
+    '''
+    # Upper bound on a single wait in case an event is ever missed
+    timeout = 1.0
+
+    def __init__(self, filename):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = libc.inotify_init1(IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        dirname, self.name = os.path.split(os.path.abspath(filename))
+        self.name = os.fsencode(self.name)
+        mask = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM |
+                IN_MOVED_TO | IN_CREATE | IN_DELETE)
+        if libc.inotify_add_watch(self.fd, os.fsencode(dirname), mask) < 0:
+            errno = ctypes.get_errno()
+            os.close(self.fd)
+            raise OSError(errno, 'inotify_add_watch failed')
+
+    def wait(self, timeout=None):
+        '''
+        Wait for an event on the file, or at most timeout seconds.  Events
+        for other files in the same directory are drained and ignored.
+        '''
+        timeout = self.timeout if timeout is None else min(self.timeout, timeout)
+        deadline = time.monotonic() + timeout
         while True:
-             line = f.readline()
-             if line == '':
-                 time.sleep(0.1)    # Sleep briefly to avoid busy wait
-                 continue
-             yield line
+            ready, _, _ = select.select([self.fd], [], [], max(deadline - time.monotonic(), 0))
+            if not ready:
+                return
+            data = os.read(self.fd, 65536)
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, size = _event.unpack_from(data, offset)
+                offset += _event.size
+                name = data[offset:offset+size].rstrip(b'\0')
+                offset += size
+                if name == self.name or mask & IN_Q_OVERFLOW:
+                    return
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
+
+# Sample use
+if __name__ == '__main__':
+    import sys
+    # python follow.py [filename | --feed host:port | --feed socketpath]
+    if len(sys.argv) > 2 and sys.argv[1] == '--feed':
+        host, sep, port = sys.argv[2].rpartition(':')
+        batches = follow_socket((host or 'localhost', int(port)) if sep else sys.argv[2], batch=True)
+    else:
+        filename = sys.argv[1] if len(sys.argv) > 1 else '../../Data/stocklog.csv'
+        batches = follow(filename, batch=True)
+    for lines in batches:
+        for line in lines:
+            fields = line.split(',')
+            name = fields[0].strip('"')
+            price = float(fields[1])
+            change = float(fields[4])
+            if change < 0:
+                print('%10s %10.2f %10.2f' % (name, price, change))
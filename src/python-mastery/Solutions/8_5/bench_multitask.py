@@ -0,0 +1,32 @@
+# bench_multitask.py
+#
+# Cost per task switch in multitask.run() as the number of tasks grows.
+# Each task does nothing but yield, so this is all scheduler overhead.
+#
+#    python bench_multitask.py [ntasks ...]
+
+import sys
+import time
+import contextlib
+import io
+import multitask
+
+def idle(n):
+    for _ in range(n):
+        yield
+
+if __name__ == '__main__':
+    counts = [ int(arg) for arg in sys.argv[1:] ] or [ 100, 10_000, 50_000 ]
+    switches = 1_000_000
+    print('%8s %12s' % ('tasks', 'ns/switch'))
+    for ntasks in counts:
+        multitask.all_tasks.clear()
+        multitask.finished.clear()
+        for n in range(ntasks):
+            multitask.spawn(idle(switches // ntasks), priority=n % 3)
+        start = time.perf_counter_ns()
+        with contextlib.redirect_stdout(io.StringIO()):
+            multitask.run()
+        elapsed = time.perf_counter_ns() - start
+        steps = sum(s.steps for s in multitask.stats())
+        print('%8d %12.0f' % (ntasks, elapsed / steps))
@@ -0,0 +1,85 @@
+# bench_server.py
+#
+# Echo round trips per second through server.py with the epoll
+# scheduler (run) and with the original select() loop (run_select), for
+# growing numbers of concurrent connections.  Every connection sends a
+# message and waits for the reply, round after round.
+#
+#    python bench_server.py [connections ...]
+
+import os
+import sys
+import time
+import socket
+import multiprocessing
+from selectors import DefaultSelector, EVENT_READ
+
+def serve(runner, port):
+    sys.stdout = open(os.devnull, 'w')
+    import server
+    server.tasks.append(server.tcp_server(('127.0.0.1', port), server.echo_handler))
+    getattr(server, runner)()
+
+def connect(port, nconn):
+    socks = []
+    for _ in range(nconn):
+        s = socket.create_connection(('127.0.0.1', port))
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        socks.append(s)
+    return socks
+
+def rounds(socks, nrounds):
+    '''
+    Run nrounds of ping/reply over every socket.  Returns the number of
+    completed round trips.
+    '''
+    sel = DefaultSelector()
+    for s in socks:
+        s.setblocking(False)
+        sel.register(s, EVENT_READ)
+    done = 0
+    for _ in range(nrounds):
+        for s in socks:
+            s.send(b'ping')
+        pending = len(socks)
+        while pending:
+            ready = sel.select(10)
+            if not ready:
+                raise RuntimeError('Server stopped responding')
+            for key, _ in ready:
+                if key.fileobj.recv(100):
+                    pending -= 1
+                    done += 1
+    sel.close()
+    return done
+
+def bench(runner, port, nconn, nrounds):
+    proc = multiprocessing.Process(target=serve, args=(runner, port), daemon=True)
+    proc.start()
+    time.sleep(0.5)
+    try:
+        socks = connect(port, nconn)
+        start = time.perf_counter()
+        done = rounds(socks, nrounds)
+        elapsed = time.perf_counter() - start
+        for s in socks:
+            s.close()
+        return done / elapsed
+    except (OSError, RuntimeError) as e:
+        return e
+    finally:
+        proc.terminate()
+        proc.join()
+
+if __name__ == '__main__':
+    counts = [ int(arg) for arg in sys.argv[1:] ] or [ 10, 100, 1000, 10000 ]
+    port = 25100
+    print('%12s %14s %14s' % ('connections', 'select rt/s', 'epoll rt/s'))
+    for nconn in counts:
+        nrounds = max(20, 20000 // nconn)
+        results = [ ]
+        for runner in ('run_select', 'run'):
+            port += 1
+            rate = bench(runner, port, nconn, nrounds)
+            results.append('%14.0f' % rate if isinstance(rate, float) else '%14s' % 'failed')
+        print('%12d %s %s' % (nconn, *results))
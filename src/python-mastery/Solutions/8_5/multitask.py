@@ -1,17 +1,104 @@
 # multitask.py
 
-from collections import deque
+from collections import deque, namedtuple
+from time import perf_counter_ns
+
+# Priority levels.  Lower numbers run first.  Tasks at the same level
+# take turns (round-robin).
+HIGH, NORMAL, LOW = range(3)
+
+queues = [ deque() for _ in range(LOW + 1) ]
+
+# The original interface: generators added with tasks.append() run at
+# NORMAL priority
+tasks = queues[NORMAL]
+
+all_tasks = set()   # Tasks not finished yet
+finished = { }      # (name, priority) -> TaskStats totals of finished tasks
+
+class Task:
+    '''
+    A generator plus its scheduling and accounting information
+    '''
+    __slots__ = ('gen', 'name', 'priority', 'steps', 'ns', 'done')
+
+    def __init__(self, gen, priority, name):
+        self.gen = gen
+        self.name = name
+        self.priority = priority
+        self.steps = 0          # Times the task has run
+        self.ns = 0             # Total time spent running it
+        self.done = False
+
+def _new_task(gen, priority, name):
+    task = Task(gen, priority, name or getattr(gen, '__name__', repr(gen)))
+    all_tasks.add(task)
+    return task
+
+def spawn(gen, priority=NORMAL, name=None):
+    '''
+    Schedule a generator to run as a task
+    '''
+    task = _new_task(gen, priority, name)
+    queues[priority].append(task)
+    return task
+
+def _finish(task):
+    '''
+    Fold a finished task into the totals for its name, so that finished
+    tasks (and their generators) aren't kept around
+    '''
+    task.done = True
+    task.gen = None
+    all_tasks.discard(task)
+    key = (task.name, task.priority)
+    total = finished.get(key)
+    if total:
+        finished[key] = total._replace(steps=total.steps + task.steps,
+                                       ns=total.ns + task.ns, done=total.done + 1)
+    else:
+        finished[key] = TaskStats(task.name, task.priority, task.steps, task.ns, 1)
 
-tasks = deque()
 def run():
-    while tasks:
-        task = tasks.popleft()
+    while True:
+        # Highest priority level with tasks ready
+        for queue in queues:
+            if queue:
+                break
+        else:
+            return
+        task = queue.popleft()
+        if type(task) is not Task:
+            task = _new_task(task, NORMAL, None)    # Added with tasks.append()
+        start = perf_counter_ns()
         try:
-            next(task)
-            tasks.append(task)
+            next(task.gen)
         except StopIteration:
+            done = True
+        else:
+            done = False
+            queues[task.priority].append(task)
+        task.ns += perf_counter_ns() - start
+        task.steps += 1
+        if done:
+            _finish(task)
             print('Task done')
 
+# For a running task, done is 0.  For finished tasks, there is one entry
+# per name and priority with the totals, and done is how many finished.
+TaskStats = namedtuple('TaskStats', ['name', 'priority', 'steps', 'ns', 'done'])
+
+def stats(include_done=True):
+    '''
+    Snapshot of the accounting for the running tasks, and the totals for
+    finished ones, busiest first
+    '''
+    snapshot = [ TaskStats(t.name, t.priority, t.steps, t.ns, 0) for t in all_tasks ]
+    if include_done:
+        snapshot.extend(finished.values())
+    snapshot.sort(key=lambda s: s.ns, reverse=True)
+    return snapshot
+
 def countdown(n):
     while n > 0:
         print('T-minus', n)
@@ -26,8 +113,10 @@ def countup(n):
         x += 1
 
 if __name__ == '__main__':
-    tasks.append(countdown(10))
-    tasks.append(countdown(5))
-    tasks.append(countup(20))
+    spawn(countdown(10))
+    spawn(countdown(5), priority=HIGH)
+    spawn(countup(20), priority=LOW)
+    tasks.append(countdown(3))
     run()
-
+    for s in stats():
+        print('%-10s priority %d %4d steps %10d ns %d done' % (s.name, s.priority, s.steps, s.ns, s.done))
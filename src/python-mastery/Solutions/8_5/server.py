@@ -1,21 +1,131 @@
 # server.py
 
 from socket import *
-from select import select
+from select import select, POLLIN, POLLOUT, POLLERR, POLLHUP
 from collections import deque
+from itertools import count
+import heapq
+import time
+
+try:
+    from select import epoll as Poller      # Linux
+    _timeout_scale = 1
+except ImportError:
+    from select import poll as Poller
+    _timeout_scale = 1000                    # poll() takes milliseconds
 
 tasks = deque()
+sleeping = []    #  heap of (deadline, seq, task)
+_seq = count()
+
+# Sockets are registered with the poller once and their interest is
+# updated in place when the tasks waiting on them change.
+poller = Poller()
+waiting = {}     #  sock -> Waiting
+fds = {}         #  fd -> Waiting registered with the poller
+changed = set()  #  socks whose waiting tasks changed since the last poll
+
+class Waiting:
+    __slots__ = ('sock', 'fd', 'recv', 'send', 'events')
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.fd = sock.fileno()
+        self.recv = self.send = None
+        self.events = 0         # Events registered with the poller
+
+def _wait(sock, reason, task):
+    w = waiting.get(sock)
+    if w is None:
+        w = waiting[sock] = Waiting(sock)
+    setattr(w, reason, task)
+    changed.add(sock)
+
+def _update_interest():
+    for sock in changed:
+        w = waiting[sock]
+        events = (POLLIN if w.recv else 0) | (POLLOUT if w.send else 0)
+        if events == w.events:
+            pass
+        elif not events:
+            # The socket may be closed already and its fd reused
+            if fds.get(w.fd) is w:
+                del fds[w.fd]
+                try:
+                    poller.unregister(w.fd)
+                except (OSError, KeyError):
+                    pass
+        elif w.events:
+            poller.modify(w.fd, events)
+        else:
+            poller.register(w.fd, events)
+            fds[w.fd] = w
+        w.events = events
+        if not events:
+            del waiting[sock]
+    changed.clear()
+
+def _poll():
+    '''
+    Wait for I/O or the next timer and move the ready tasks to the queue
+    '''
+    _update_interest()
+    if not (waiting or sleeping):
+        return
+    timeout = max(sleeping[0][0] - time.monotonic(), 0) * _timeout_scale if sleeping else None
+    for fd, events in poller.poll(timeout):
+        w = fds.get(fd)
+        if w is None:
+            continue
+        if events & (POLLIN | POLLERR | POLLHUP) and w.recv:
+            tasks.append(w.recv)
+            w.recv = None
+        if events & (POLLOUT | POLLERR | POLLHUP) and w.send:
+            tasks.append(w.send)
+            w.send = None
+        changed.add(w.sock)
+    _wake_sleepers()
+
+def _wake_sleepers():
+    now = time.monotonic()
+    while sleeping and sleeping[0][0] <= now:
+        tasks.append(heapq.heappop(sleeping)[2])
+
+def _sleep_until(deadline, task):
+    heapq.heappush(sleeping, (deadline, next(_seq), task))
+
+def run():
+    while tasks or waiting or sleeping:
+        if not tasks:
+            _poll()
+            continue
+        task = tasks.popleft()
+        try:
+            reason, resource = task.send(None)
+            if reason == 'recv' or reason == 'send':
+                _wait(resource, reason, task)
+            elif reason == 'sleep':
+                _sleep_until(time.monotonic() + resource, task)
+            else:
+                raise RuntimeError('Unknown reason %r' % reason)
+        except StopIteration:
+            print('Task done')
+
+# The original select() loop, kept for comparison.  The select() argument
+# sets are rebuilt on every wakeup and limited to FD_SETSIZE descriptors.
 recv_wait = {}   #  sock -> task
 send_wait = {}   #  sock -> task
 
-def run():
-    while any([tasks, recv_wait, send_wait]):
+def run_select():
+    while any([tasks, recv_wait, send_wait, sleeping]):
         while not tasks:
-            can_recv, can_send, _ = select(recv_wait, send_wait, [])
+            timeout = max(sleeping[0][0] - time.monotonic(), 0) if sleeping else None
+            can_recv, can_send, _ = select(recv_wait, send_wait, [], timeout)
             for s in can_recv:
                 tasks.append(recv_wait.pop(s))
             for s in can_send:
                 tasks.append(send_wait.pop(s))
+            _wake_sleepers()
         task = tasks.popleft()
         try:
             reason, resource = task.send(None)
@@ -23,21 +133,26 @@ def run():
                 recv_wait[resource] = task
             elif reason == 'send':
                 send_wait[resource] = task
+            elif reason == 'sleep':
+                _sleep_until(time.monotonic() + resource, task)
             else:
                 raise RuntimeError('Unknown reason %r' % reason)
         except StopIteration:
             print('Task done')
 
+def sleep(seconds):
+    yield 'sleep', seconds
+
 def tcp_server(address, handler):
     sock = socket(AF_INET, SOCK_STREAM)
     sock.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
     sock.bind(address)
-    sock.listen(5)
+    sock.listen(SOMAXCONN)
     while True:
         yield 'recv', sock
         client, addr = sock.accept()
         tasks.append(handler(client, addr))
-        
+
 def echo_handler(client, address):
     print('Connection from', address)
     while True:
@@ -47,9 +162,13 @@ def echo_handler(client, address):
             break
         yield 'send', client
         client.send(b'GOT:' + data)
+    client.close()
     print('Connection closed')
 
 if __name__ == '__main__':
+    import sys
     tasks.append(tcp_server(('',25000), echo_handler))
-    run()
-
+    if '--select' in sys.argv:
+        run_select()
+    else:
+        run()
@@ -0,0 +1,192 @@
+# aioticker.py
+#
+# asyncio version of the ticker pipeline.  Stages are connected by bounded
+# queues, so a slow stage or sink makes the stages in front of it wait
+# (backpressure) instead of letting data pile up.
+
+import asyncio
+import csv
+import inspect
+import sys
+import threading
+import traceback
+from follow import follow
+from coticker import Ticker
+
+_DONE = object()        # Sentinel sent to each worker when input runs out
+
+class Stage:
+    '''
+    One step of a Pipeline: a function applied by some number of worker
+    tasks to the items in a bounded input queue.
+    '''
+    def __init__(self, name, func, workers, maxsize):
+        self.name = name
+        self.func = func
+        self.workers = workers
+        self.queue = asyncio.Queue(maxsize)
+        self.processed = 0
+        self.errors = 0         # Items for which func raised
+        self.high = 0           # Highest queue depth seen
+
+    async def put(self, item):
+        await self.queue.put(item)
+        if self.queue.qsize() > self.high:
+            self.high = self.queue.qsize()
+
+    async def work(self, outputs):
+        while True:
+            item = await self.queue.get()
+            if item is _DONE:
+                return
+            try:
+                result = self.func(item)
+                if inspect.isawaitable(result):
+                    result = await result
+            except Exception:
+                # A bad item (e.g. a malformed line) is reported and
+                # skipped rather than killing the worker
+                self.errors += 1
+                print(f'{self.name}: error processing {item!r}', file=sys.stderr)
+                traceback.print_exc()
+                continue
+            self.processed += 1
+            if result is not None:
+                for output in outputs:
+                    await output.put(result)
+
+    async def run(self, outputs):
+        await asyncio.gather(*(self.work(outputs) for _ in range(self.workers)))
+        for output in outputs:
+            for _ in range(output.workers):
+                await output.queue.put(_DONE)
+
+class Pipeline:
+    '''
+    Items from a source pass through each stage in order, then every
+    result is sent to all of the sinks.  A stage function (plain or async)
+    returns the item to pass on, or None to drop it.  With more than one
+    worker on a stage, items may come out of it in a different order.
+    '''
+    def __init__(self, maxsize=100):
+        self.maxsize = maxsize
+        self.stages = []
+        self.sinks = []
+
+    def add_stage(self, name, func, *, workers=1, maxsize=None):
+        self.stages.append(Stage(name, func, workers, maxsize or self.maxsize))
+        return self
+
+    def add_sink(self, name, func, *, workers=1, maxsize=None):
+        self.sinks.append(Stage(name, func, workers, maxsize or self.maxsize))
+        return self
+
+    def metrics(self):
+        '''
+        Return {name: {depth, maxsize, high, processed, errors}} for the queue in
+        front of each stage and sink.  A queue that sits at maxsize marks
+        the stage holding everything up.
+        '''
+        return { stage.name: { 'depth': stage.queue.qsize(),
+                               'maxsize': stage.queue.maxsize,
+                               'high': stage.high,
+                               'processed': stage.processed,
+                               'errors': stage.errors }
+                 for stage in self.stages + self.sinks }
+
+    async def monitor(self, interval=1.0, file=sys.stderr):
+        '''
+        Print the queue depths every interval seconds
+        '''
+        while True:
+            await asyncio.sleep(interval)
+            print(' '.join('%s=%d/%d' % (name, m['depth'], m['maxsize'])
+                           for name, m in self.metrics().items()), file=file)
+
+    async def run(self, source):
+        '''
+        Feed items from an async iterable through the pipeline.  Returns
+        when the source is exhausted and everything has been processed.
+        '''
+        if not self.sinks:
+            raise RuntimeError('Pipeline has no sinks')
+        outputs = [ [stage] for stage in self.stages[1:] ] + [ self.sinks ]
+        tasks = [ asyncio.create_task(stage.run(output))
+                  for stage, output in zip(self.stages, outputs) ]
+        tasks += [ asyncio.create_task(sink.run([])) for sink in self.sinks ]
+        first = self.stages[:1] or self.sinks
+
+        async def feed():
+            async for item in source:
+                for stage in first:
+                    await stage.put(item)
+            for stage in first:
+                for _ in range(stage.workers):
+                    await stage.queue.put(_DONE)
+
+        # If a stage dies, nothing drains its queue and feeding would
+        # block forever, so fail the whole pipeline instead
+        feeder = asyncio.create_task(feed())
+        try:
+            done, _ = await asyncio.wait(tasks + [feeder],
+                                         return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+            await asyncio.gather(*tasks, feeder)
+        finally:
+            for task in tasks + [feeder]:
+                task.cancel()
+
+async def afollow(filename, maxsize=10):
+    '''
+    Async generator of lines appended to a file.  The blocking follow()
+    runs in a daemon thread and hands over one batch of lines per wakeup
+    through a bounded queue.
+    '''
+    loop = asyncio.get_running_loop()
+    batches = asyncio.Queue(maxsize)
+
+    def reader():
+        for batch in follow(filename, batch=True):
+            asyncio.run_coroutine_threadsafe(batches.put(batch), loop).result()
+
+    threading.Thread(target=reader, daemon=True).start()
+    while True:
+        for line in await batches.get():
+            yield line
+
+def parse_line(line):
+    return Ticker.from_row(next(csv.reader([line])))
+
+if __name__ == '__main__':
+    from collections import Counter
+    from tableformat import create_formatter
+
+    fields = ['name', 'price', 'change']
+    formatter = create_formatter('text')
+    formatter.headings(fields)
+    drops = Counter()
+
+    def show(rec):
+        formatter.row([getattr(rec, name) for name in fields])
+
+    def tally(rec):
+        drops[rec.name] += 1
+
+    pipeline = (Pipeline(maxsize=100)
+                .add_stage('parse', parse_line, workers=2)
+                .add_stage('negchange', lambda rec: rec if rec.change < 0 else None)
+                .add_sink('table', show)
+                .add_sink('tally', tally))
+
+    async def main():
+        monitor = asyncio.create_task(pipeline.monitor(5.0))
+        try:
+            await pipeline.run(afollow('../../Data/stocklog.csv'))
+        finally:
+            monitor.cancel()
+
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        print(drops.most_common(5))
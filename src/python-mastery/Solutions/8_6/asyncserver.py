@@ -1,33 +1,126 @@
 # server.py
 
 from socket import *
-from select import select
+from select import POLLIN, POLLOUT, POLLERR, POLLHUP
 from collections import deque
+from itertools import count
 from types import coroutine
+import heapq
+import os
+import signal
+import time
+import traceback
+
+try:
+    from select import epoll as Poller      # Linux
+    _timeout_scale = 1
+except ImportError:
+    from select import poll as Poller
+    _timeout_scale = 1000                    # poll() takes milliseconds
 
 tasks = deque()
-recv_wait = {}   #  sock -> task
-send_wait = {}   #  sock -> task
+sleeping = []    #  heap of (deadline, seq, task)
+_seq = count()
+
+# Sockets are registered with the poller once and their interest is
+# updated in place when the tasks waiting on them change.
+poller = Poller()
+waiting = {}     #  sock -> Waiting
+fds = {}         #  fd -> Waiting registered with the poller
+changed = set()  #  socks whose waiting tasks changed since the last poll
+
+class Waiting:
+    __slots__ = ('sock', 'fd', 'recv', 'send', 'events')
+
+    def __init__(self, sock):
+        self.sock = sock
+        self.fd = sock.fileno()
+        self.recv = self.send = None
+        self.events = 0         # Events registered with the poller
+
+def _wait(sock, reason, task):
+    w = waiting.get(sock)
+    if w is None:
+        w = waiting[sock] = Waiting(sock)
+    setattr(w, reason, task)
+    changed.add(sock)
+
+def _update_interest():
+    for sock in changed:
+        w = waiting[sock]
+        events = (POLLIN if w.recv else 0) | (POLLOUT if w.send else 0)
+        if events == w.events:
+            pass
+        elif not events:
+            # The socket may be closed already and its fd reused
+            if fds.get(w.fd) is w:
+                del fds[w.fd]
+                try:
+                    poller.unregister(w.fd)
+                except (OSError, KeyError):
+                    pass
+        elif w.events:
+            poller.modify(w.fd, events)
+        else:
+            poller.register(w.fd, events)
+            fds[w.fd] = w
+        w.events = events
+        if not events:
+            del waiting[sock]
+    changed.clear()
+
+def _poll():
+    '''
+    Wait for I/O or the next timer and move the ready tasks to the queue
+    '''
+    _update_interest()
+    if not (waiting or sleeping):
+        return
+    timeout = max(sleeping[0][0] - time.monotonic(), 0) * _timeout_scale if sleeping else None
+    for fd, events in poller.poll(timeout):
+        w = fds.get(fd)
+        if w is None:
+            continue
+        if events & (POLLIN | POLLERR | POLLHUP) and w.recv:
+            tasks.append(w.recv)
+            w.recv = None
+        if events & (POLLOUT | POLLERR | POLLHUP) and w.send:
+            tasks.append(w.send)
+            w.send = None
+        changed.add(w.sock)
+    _wake_sleepers()
+
+def _wake_sleepers():
+    now = time.monotonic()
+    while sleeping and sleeping[0][0] <= now:
+        tasks.append(heapq.heappop(sleeping)[2])
+
+def _sleep_until(deadline, task):
+    heapq.heappush(sleeping, (deadline, next(_seq), task))
 
 def run():
-    while any([tasks, recv_wait, send_wait]):
-        while not tasks:
-            can_recv, can_send, _ = select(recv_wait, send_wait, [])
-            for s in can_recv:
-                tasks.append(recv_wait.pop(s))
-            for s in can_send:
-                tasks.append(send_wait.pop(s))
+    while tasks or waiting or sleeping:
+        if not tasks:
+            _poll()
+            continue
         task = tasks.popleft()
         try:
             reason, resource = task.send(None)
-            if reason == 'recv':
-                recv_wait[resource] = task
-            elif reason == 'send':
-                send_wait[resource] = task
+            if reason == 'recv' or reason == 'send':
+                _wait(resource, reason, task)
+            elif reason == 'sleep':
+                _sleep_until(time.monotonic() + resource, task)
             else:
                 raise RuntimeError('Unknown reason %r' % reason)
         except StopIteration:
             print('Task done')
+        except Exception:
+            # A failing connection handler shouldn't take the server down
+            traceback.print_exc()
+
+@coroutine
+def sleep(seconds):
+    yield 'sleep', seconds
 
 class GenSocket:
     def __init__(self, sock):
@@ -39,38 +132,203 @@ class GenSocket:
         client, addr = self.sock.accept()
         return GenSocket(client), addr
 
+    @coroutine
+    def readable(self):
+        '''
+        Wait until there is data (or end of file) to receive
+        '''
+        yield 'recv', self.sock
+
     @coroutine
     def recv(self, maxsize):
         yield 'recv', self.sock
         return self.sock.recv(maxsize)
 
+    @coroutine
+    def recv_into(self, buffer, nbytes=0):
+        yield 'recv', self.sock
+        return self.sock.recv_into(buffer, nbytes)
+
     @coroutine
     def send(self, data):
         yield 'send', self.sock
         return self.sock.send(data)
 
+    @coroutine
+    def sendall(self, data):
+        '''
+        Send all of data, resuming after partial writes from a memoryview
+        slice rather than a copy
+        '''
+        view = memoryview(data)
+        while view:
+            yield 'send', self.sock
+            view = view[self.sock.send(view):]
+
+    @coroutine
+    def sendmsg(self, buffers):
+        '''
+        Send several buffers with one vectored write each time the socket
+        is ready (e.g. a header and a payload), without joining them
+        '''
+        yield 'send', self.sock
+        nsent = self.sock.sendmsg(buffers)
+        if nsent == sum(map(len, buffers)):
+            return
+        # Partial write.  Drop what was sent and slice into the first
+        # partly sent buffer
+        buffers = list(buffers)
+        while True:
+            while nsent >= len(buffers[0]):
+                nsent -= len(buffers.pop(0))
+            if nsent:
+                buffers[0] = memoryview(buffers[0])[nsent:]
+            yield 'send', self.sock
+            nsent = self.sock.sendmsg(buffers)
+            if nsent == sum(map(len, buffers)):
+                return
+
     def __getattr__(self, name):
         return getattr(self.sock, name)
 
-async def tcp_server(address, handler):
+class BufferPool:
+    '''
+    Reusable buffers (memoryviews of bytearrays) for recv_into(), so that
+    receiving doesn't make a new bytes object for every message
+    '''
+    def __init__(self, size=65536):
+        self.size = size
+        self.free = []
+        self.allocated = 0
+
+    def get(self):
+        if self.free:
+            return self.free.pop()
+        self.allocated += 1
+        return memoryview(bytearray(self.size))
+
+    def put(self, buf):
+        self.free.append(buf)
+
+buffers = BufferPool()
+
+async def tcp_server(address, handler, *, reuse_port=False):
     sock = GenSocket(socket(AF_INET, SOCK_STREAM))
     sock.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+    if reuse_port:
+        sock.setsockopt(SOL_SOCKET, SO_REUSEPORT, 1)
     sock.bind(address)
-    sock.listen(5)
+    sock.listen(SOMAXCONN)
     while True:
         client, addr = await sock.accept()
         tasks.append(handler(client, addr))
         
 async def echo_handler(client, address):
     print('Connection from', address)
-    while True:
-        data = await client.recv(1000)
-        if not data:
-            break
-        await client.send(b'GOT:' + data)
+    try:
+        while True:
+            # Only hold a pooled buffer while there's data to handle, so
+            # idle connections don't tie up memory
+            await client.readable()
+            buf = buffers.get()
+            try:
+                nbytes = client.sock.recv_into(buf)
+                if not nbytes:
+                    break
+                await client.sendmsg([b'GOT:', buf[:nbytes]])
+            finally:
+                buffers.put(buf)
+    finally:
+        client.close()
     print('Connection closed')
 
-if __name__ == '__main__':
-    tasks.append(tcp_server(('',25000), echo_handler))
-    run()
+# Prefork mode.  Each worker process runs its own task loop.
 
+def prefork(address, handler, workers=None):
+    '''
+    Serve on address with several worker processes (default: one per
+    CPU).  Each worker listens on its own socket bound with SO_REUSEPORT,
+    so the kernel spreads new connections over them.  The master restarts
+    any worker that exits until it gets SIGINT or SIGTERM.
+    '''
+    workers = workers or os.cpu_count() or 1
+
+    # Claim the address here so that errors show up in the master.  This
+    # socket never listens, so no connections are sent to it.
+    master = socket(AF_INET, SOCK_STREAM)
+    master.setsockopt(SOL_SOCKET, SO_REUSEADDR, 1)
+    master.setsockopt(SOL_SOCKET, SO_REUSEPORT, 1)
+    master.bind(address)
+
+    children = {}       # pid -> (worker number, start time)
+    stopping = False
+
+    def start(n):
+        # Hold off signals until the child has reset its handlers and
+        # the parent has recorded it.  A stop handled when they're
+        # unblocked then sees the new worker, and one handled earlier
+        # stops it from being started.
+        signal.pthread_sigmask(signal.SIG_BLOCK, {signal.SIGINT, signal.SIGTERM})
+        try:
+            if stopping:
+                return
+            pid = os.fork()
+            if pid == 0:
+                master.close()
+                _worker(address, handler)
+            children[pid] = (n, time.monotonic())
+        finally:
+            signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT, signal.SIGTERM})
+        print('Worker %d started, pid %d' % (n, pid))
+
+    def stop(signo, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in children:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+    for n in range(workers):
+        start(n)
+    while children:
+        pid, status = os.wait()
+        n, started = children.pop(pid)
+        if stopping:
+            continue
+        print('Worker %d (pid %d) exited with status %d. Restarting' %
+              (n, pid, os.waitstatus_to_exitcode(status)))
+        if time.monotonic() - started < 1.0:
+            time.sleep(1.0)         # Don't spin if a worker keeps crashing
+        start(n)
+    master.close()
+
+def _worker(address, handler):
+    '''
+    Body of a forked worker process.  Never returns.
+    '''
+    global poller
+    signal.signal(signal.SIGINT, signal.SIG_IGN)     # The master handles ^C
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.pthread_sigmask(signal.SIG_UNBLOCK, {signal.SIGINT, signal.SIGTERM})
+    poller = Poller()       # Don't share the parent's epoll instance
+    status = 0
+    try:
+        tasks.append(tcp_server(address, handler, reuse_port=True))
+        run()
+    except BaseException:
+        traceback.print_exc()
+        status = 1
+    finally:
+        os._exit(status)
+
+if __name__ == '__main__':
+    import sys
+    if len(sys.argv) > 1:
+        prefork(('',25000), echo_handler, int(sys.argv[1]))
+    else:
+        tasks.append(tcp_server(('',25000), echo_handler))
+        run()
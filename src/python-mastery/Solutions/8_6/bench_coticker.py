@@ -0,0 +1,86 @@
+# bench_coticker.py
+#
+# Per-record cost of the coticker pipeline, sending one line at a time
+# versus sending batches.  The feed is simulated: lines arrive at the given
+# rate and each wakeup of follow() delivers everything written since the
+# last one.
+#
+#    python bench_coticker.py [nlines] [lines/sec] [wakeups/sec]
+
+import csv
+import sys
+import time
+from cofollow import consumer, receive, batcher
+from coticker import (Ticker, to_csv, create_ticker, negchange,
+                      to_csv_batch, create_ticker_batch, negchange_batch)
+
+def make_lines(nlines):
+    names = ['AA', 'AXP', 'BA', 'C', 'CAT', 'DD', 'DIS', 'GE', 'GM', 'HD']
+    return [ '"%s",%0.2f,"6/11/2007","09:30am",%0.2f,39.67,39.69,39.45,%d\n' %
+             (names[n % len(names)], 39.5 + (n % 7) / 10, (n % 5) - 2.5, 1000 + n)
+             for n in range(nlines) ]
+
+@consumer
+def count_records(counts):
+    while True:
+        record = yield
+        counts[0] += 1
+
+@consumer
+def count_batches(counts):
+    while True:
+        records = yield from receive(list)
+        counts[0] += len(records)
+
+def run(pipeline, chunks, batched):
+    start = time.perf_counter()
+    for chunk in chunks:
+        if batched:
+            pipeline.send(chunk)
+        else:
+            for line in chunk:
+                pipeline.send(line)
+    pipeline.close()
+    return time.perf_counter() - start
+
+def run_bare(chunks):
+    '''
+    The same work as a plain loop, to separate the cost of the pipeline
+    from the cost of parsing and creating the records.
+    '''
+    start = time.perf_counter()
+    count = 0
+    for chunk in chunks:
+        for row in csv.reader(chunk):
+            if Ticker.from_row(row).change < 0:
+                count += 1
+    return time.perf_counter() - start
+
+if __name__ == '__main__':
+    nlines = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    rate = int(sys.argv[2]) if len(sys.argv) > 2 else 100_000
+    wakeups = int(sys.argv[3]) if len(sys.argv) > 3 else 100
+
+    lines = make_lines(nlines)
+    per_wakeup = max(rate // wakeups, 1)
+    chunks = [ lines[n:n+per_wakeup] for n in range(0, nlines, per_wakeup) ]
+
+    # Best of a few runs each
+    single, batched = [0], [0]
+    t_single = t_batch = t_bare = float('inf')
+    for _ in range(3):
+        single[0] = batched[0] = 0
+        t_single = min(t_single, run(to_csv(create_ticker(negchange(count_records(single)))),
+                                     chunks, False))
+        t_batch = min(t_batch, run(batcher(to_csv_batch(create_ticker_batch(
+                                           negchange_batch(count_batches(batched)))),
+                                           size=1000, interval=0.1),
+                                   chunks, True))
+        t_bare = min(t_bare, run_bare(chunks))
+
+    assert single == batched, (single, batched)
+    print('%d lines at %d lines/sec, %d lines per wakeup, %d negative' %
+          (nlines, rate, per_wakeup, single[0]))
+    print('%-8s %10s %14s' % ('', 'us/line', 'overhead us'))
+    for label, t in [('bare', t_bare), ('single', t_single), ('batched', t_batch)]:
+        print('%-8s %10.2f %14.2f' % (label, t / nlines * 1e6, (t - t_bare) / nlines * 1e6))
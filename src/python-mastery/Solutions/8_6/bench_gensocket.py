@@ -0,0 +1,78 @@
+# bench_gensocket.py
+#
+# Echo throughput and memory allocated per message for the original
+# echo_handler (recv() a new bytes object, reply with b'GOT:' + data) and
+# the current one (recv_into() a pooled buffer, sendmsg() the prefix and
+# a memoryview of the payload).  The handlers are driven directly over a
+# socketpair, so only their own work is measured.
+#
+#    python bench_gensocket.py [nmsgs]
+
+import contextlib
+import io
+import socket
+import sys
+import time
+import tracemalloc
+from asyncserver import GenSocket, echo_handler, buffers
+
+async def echo_handler_before(client, address, size):
+    while True:
+        data = await client.recv(size)
+        if not data:
+            break
+        await client.send(b'GOT:' + data)
+
+def drive(handler, msg, nmsgs, measure_alloc=False):
+    '''
+    Echo nmsgs copies of msg through handler.  Returns the elapsed time
+    and the total of the peak memory allocated while handling each message.
+    '''
+    client, server = socket.socketpair()
+    task = handler(GenSocket(server), None)
+    reply = bytearray(len(msg) + 4)
+    view = memoryview(reply)
+    task.send(None)
+    allocated = 0
+    start = time.perf_counter()
+    for _ in range(nmsgs):
+        if measure_alloc:
+            tracemalloc.reset_peak()
+            before = tracemalloc.get_traced_memory()[0]
+        client.sendall(msg)
+        got = 0
+        while got < len(reply):
+            task.send(None)                         # recv -> send
+            task.send(None)                         # send -> next recv
+            got += client.recv_into(view[got:])
+        if measure_alloc:
+            allocated += tracemalloc.get_traced_memory()[1] - before
+    elapsed = time.perf_counter() - start
+    view.release()
+    client.close()
+    try:
+        task.send(None)
+    except StopIteration:
+        pass
+    server.close()
+    return elapsed, allocated
+
+if __name__ == '__main__':
+    nmsgs = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print('%8s %-8s %10s %16s' % ('msgsize', 'handler', 'MB/s', 'alloc bytes/msg'))
+    with contextlib.redirect_stdout(io.StringIO()):
+        results = []
+        for size in (1000, 16384, 65000):
+            msg = b'x' * size
+            for label, handler in [
+                    ('before', lambda client, addr: echo_handler_before(client, addr, size)),
+                    ('after', echo_handler)]:
+                elapsed = min(drive(handler, msg, nmsgs)[0] for _ in range(3))
+                tracemalloc.start()
+                _, allocated = drive(handler, msg, nmsgs // 10, measure_alloc=True)
+                tracemalloc.stop()
+                results.append((size, label, size * nmsgs / elapsed / 1e6,
+                                allocated / (nmsgs // 10)))
+    for result in results:
+        print('%8d %-8s %10.1f %16.0f' % result)
+    print('BufferPool buffers allocated:', buffers.allocated)
@@ -1,17 +1,15 @@
 # cofollow.py
-import os
-import time
-import csv
+from follow import follow as follow_lines
 
-def follow(filename,target):
-    with open(filename,"r") as f:
-        f.seek(0,os.SEEK_END)
-        while True:
-            line = f.readline()
-            if line != '':
-                target.send(line)
-            else:
-                time.sleep(0.1)
+def follow(filename, target, *, batch=False, idle=None):
+    '''
+    Send lines appended to a file to a target coroutine.  With batch=True,
+    each list of lines read in one wakeup is sent as a single item, and
+    with idle, an empty list is sent when the file has been quiet for
+    idle seconds.
+    '''
+    for item in follow_lines(filename, batch=batch, idle=idle):
+        target.send(item)
 
 def receive(expected_type):
     msg = yield
@@ -29,6 +27,51 @@ def consumer(func):
         return f
     return start
 
+# Adapters between single-item and batch (list) stages
+import time
+
+@consumer
+def batcher(target, size=1000, interval=0.1):
+    '''
+    Group items into lists of up to size items.  Items may be sent one
+    at a time or as lists (e.g. from follow(..., batch=True)).  A partial
+    batch is sent once interval seconds have passed since its first item.
+    That is only checked when something arrives, so when the source can go
+    quiet, have it send empty lists now and then (e.g. follow(...,
+    batch=True, idle=...)).  Anything left over is sent on close().
+    '''
+    batch = []
+    started = 0
+    try:
+        while True:
+            item = yield
+            if not batch:
+                started = time.monotonic()
+            if isinstance(item, list):
+                batch.extend(item)
+            else:
+                batch.append(item)
+            while len(batch) >= size:
+                target.send(batch[:size])
+                del batch[:size]
+            if batch and time.monotonic() - started >= interval:
+                target.send(batch)
+                batch = []
+    except GeneratorExit:
+        if batch:
+            target.send(batch)
+        raise
+
+@consumer
+def unbatch(target):
+    '''
+    Send each item of a batch on to a single-item stage
+    '''
+    while True:
+        batch = yield from receive(list)
+        for item in batch:
+            target.send(item)
+
 # Sample coroutine
 @consumer
 def printer():
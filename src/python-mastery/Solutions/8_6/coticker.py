@@ -13,7 +13,7 @@ class Ticker(Structure):
     low = Float()
     volume = Integer()
 
-from cofollow import consumer, follow, receive
+from cofollow import consumer, follow, receive, batcher
 from tableformat import create_formatter
 import csv
 
@@ -50,9 +50,54 @@ def ticker(fmt, fields):
         row = [getattr(rec, name) for name in fields]
         formatter.row(row)
 
+# Batch versions of the stages above.  Each one receives and sends lists
+# of items, so the per-item cost of the coroutine switch and the
+# receive() type check is paid once per batch.
+
+@consumer
+def to_csv_batch(target):
+    while True:
+        lines = yield from receive(list)
+        target.send(list(csv.reader(lines)))
+
+@consumer
+def create_ticker_batch(target):
+    from_row = Ticker.from_row
+    while True:
+        rows = yield from receive(list)
+        target.send([ from_row(row) for row in rows ])
+
+@consumer
+def negchange_batch(target):
+    while True:
+        records = yield from receive(list)
+        negative = [ rec for rec in records if rec.change < 0 ]
+        if negative:
+            target.send(negative)
+
+@consumer
+def ticker_batch(fmt, fields):
+    formatter = create_formatter(fmt)
+    formatter.headings(fields)
+    while True:
+        records = yield from receive(list)
+        for rec in records:
+            formatter.row([getattr(rec, name) for name in fields])
+
 if __name__ == '__main__':
-    follow('../../Data/stocklog.csv',
-           to_csv(
-           create_ticker(
-           negchange(
-           ticker('text', ['name','price','change'])))))
+    import sys
+    if '--batch' in sys.argv:
+        follow('../../Data/stocklog.csv',
+               batcher(
+               to_csv_batch(
+               create_ticker_batch(
+               negchange_batch(
+               ticker_batch('text', ['name','price','change'])))),
+               size=100, interval=0.5),
+               batch=True, idle=0.1)
+    else:
+        follow('../../Data/stocklog.csv',
+               to_csv(
+               create_ticker(
+               negchange(
+               ticker('text', ['name','price','change'])))))
@@ -0,0 +1,72 @@
+# echoload.py
+#
+# Load generator for asyncserver.echo_handler.  For each worker count, an
+# echo server is started in prefork mode and several client processes
+# each keep a set of connections busy with ping/reply round trips.  The
+# aggregate round trips per second should grow with the number of workers
+# up to the number of cores (the clients need cores too).
+#
+#    python echoload.py [workers ...]
+
+import os
+import sys
+import time
+import signal
+import socket
+import multiprocessing
+from selectors import DefaultSelector, EVENT_READ
+
+CLIENTS = max(os.cpu_count() // 2, 1)   # Client processes
+CONNECTIONS = 50                        # Connections per client
+SECONDS = 3.0
+
+def serve(port, workers):
+    sys.stdout = sys.stderr = open(os.devnull, 'w')
+    import asyncserver
+    asyncserver.prefork(('127.0.0.1', port), asyncserver.echo_handler, workers)
+
+def client(port, nconn, seconds):
+    '''
+    Keep nconn connections doing round trips for a number of seconds.
+    Returns the number of round trips completed.
+    '''
+    sel = DefaultSelector()
+    socks = [ socket.create_connection(('127.0.0.1', port)) for _ in range(nconn) ]
+    for s in socks:
+        s.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        s.setblocking(False)
+        sel.register(s, EVENT_READ)
+        s.send(b'ping')
+
+    done = 0
+    deadline = time.monotonic() + seconds
+    while time.monotonic() < deadline:
+        for key, _ in sel.select(1.0):
+            if key.fileobj.recv(100):
+                done += 1
+                key.fileobj.send(b'ping')
+    for s in socks:
+        s.close()
+    return done
+
+def measure(port, workers):
+    server = multiprocessing.Process(target=serve, args=(port, workers))
+    server.start()
+    time.sleep(0.5)
+    try:
+        with multiprocessing.Pool(CLIENTS) as pool:
+            counts = pool.starmap(client, [(port, CONNECTIONS, SECONDS)] * CLIENTS)
+        return sum(counts) / SECONDS
+    finally:
+        os.kill(server.pid, signal.SIGTERM)
+        server.join()
+
+if __name__ == '__main__':
+    ncpu = os.cpu_count() or 1
+    counts = [ int(arg) for arg in sys.argv[1:] ] or sorted({1, 2, 4, ncpu})
+    print('%d cores, %d client processes x %d connections' % (ncpu, CLIENTS, CONNECTIONS))
+    print('%8s %12s' % ('workers', 'rt/s'))
+    port = 25200
+    for workers in counts:
+        port += 1
+        print('%8d %12.0f' % (workers, measure(port, workers)))
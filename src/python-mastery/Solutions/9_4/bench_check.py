@@ -0,0 +1,34 @@
+# bench_check.py
+#
+# Per-assignment cost of a validated attribute, comparing the cooperative
+# super().check() chain with the flattened check made for each validator.
+#
+#    python bench_check.py [number]
+
+import sys
+from timeit import timeit
+from structly.validate import Integer, PositiveInteger, NonEmptyString
+
+class Holder:
+    shares = PositiveInteger()
+    name = NonEmptyString()
+    count = Integer()
+
+def chained_set(self, value):
+    self.__dict__['shares'] = PositiveInteger.check(value)
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    h = Holder()
+    print('%-28s %10s' % ('operation', 'ns/op'))
+    for label, stmt in [
+            ('PositiveInteger.check',      'PositiveInteger.check(100)'),
+            ('PositiveInteger.flat_check', 'PositiveInteger.flat_check(100)'),
+            ('NonEmptyString.check',       "NonEmptyString.check('GOOG')"),
+            ('NonEmptyString.flat_check',  "NonEmptyString.flat_check('GOOG')"),
+            ('chained h.shares = 100',     'chained_set(h, 100)'),
+            ('h.shares = 100',             'h.shares = 100'),
+            ("h.name = 'GOOG'",            "h.name = 'GOOG'"),
+            ('h.count = 100',              'h.count = 100')]:
+        t = timeit(stmt, globals=globals(), number=number)
+        print('%-28s %10.1f' % (label, t / number * 1e9))
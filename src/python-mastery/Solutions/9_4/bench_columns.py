@@ -0,0 +1,32 @@
+# bench_columns.py
+#
+# Compare memory use of read_csv_as_instances() and read_csv_as_columns()
+#
+#    python bench_columns.py [nrows]
+
+import os
+import sys
+import time
+import tracemalloc
+from structly import read_csv_as_instances, read_csv_as_columns
+from stock import Stock
+from benchdata import scaled_portfolio
+
+def measure(func, filename):
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = func(filename, Stock)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('%-22s %10d rows %8.2fs  Current %12d  Peak %12d' %
+          (func.__name__, len(data), elapsed, current, peak))
+
+if __name__ == '__main__':
+    nrows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    filename = scaled_portfolio(nrows)
+    try:
+        measure(read_csv_as_instances, filename)
+        measure(read_csv_as_columns, filename)
+    finally:
+        os.remove(filename)
@@ -0,0 +1,38 @@
+# bench_from_row.py
+#
+# Rows/sec of the generic Structure.from_row() versus the per-class
+# from_row() created by validate_attributes()
+#
+#    python bench_from_row.py [nrows]
+
+import csv
+import os
+import sys
+import time
+from structly import Structure
+from stock import Stock
+from benchdata import scaled_portfolio
+
+def generic_from_row(row):
+    return Structure.from_row.__func__(Stock, row)
+
+def measure(label, from_row, filename):
+    with open(filename) as f:
+        rows = csv.reader(f)
+        next(rows)
+        count = 0
+        start = time.perf_counter()
+        for row in rows:
+            from_row(row)
+            count += 1
+        elapsed = time.perf_counter() - start
+    print('%-10s %10d rows %8.2fs %12.0f rows/sec' % (label, count, elapsed, count / elapsed))
+
+if __name__ == '__main__':
+    nrows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000_000
+    filename = scaled_portfolio(nrows)
+    try:
+        measure('generic', generic_from_row, filename)
+        measure('compiled', Stock.from_row, filename)
+    finally:
+        os.remove(filename)
@@ -0,0 +1,32 @@
+# bench_parallel.py
+#
+# Time read_csv_parallel() with an increasing number of worker processes
+#
+#    python bench_parallel.py [nrows] [maxworkers]
+
+import os
+import sys
+import time
+from structly import read_csv_as_instances, read_csv_parallel
+from stock import Stock
+from benchdata import scaled_portfolio
+
+def measure(label, func, *args, **kwargs):
+    start = time.perf_counter()
+    data = func(*args, **kwargs)
+    elapsed = time.perf_counter() - start
+    print('%-24s %10d rows %8.2fs' % (label, len(data), elapsed))
+
+if __name__ == '__main__':
+    nrows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    maxworkers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count()
+    filename = scaled_portfolio(nrows)
+    try:
+        measure('read_csv_as_instances', read_csv_as_instances, filename, Stock)
+        workers = 1
+        while workers <= maxworkers:
+            measure(f'parallel workers={workers}', read_csv_parallel, filename, Stock, workers=workers)
+            measure('  as_columns', read_csv_parallel, filename, Stock, workers=workers, as_columns=True)
+            workers *= 2
+    finally:
+        os.remove(filename)
@@ -0,0 +1,29 @@
+# bench_tableformat.py
+#
+# Throughput of print_table() for each output format, writing a line at a
+# time (flushsize=1) versus in batches
+#
+#    python bench_tableformat.py [nrows] [output]
+
+import os
+import sys
+import time
+from structly import create_formatter, print_table
+from stock import Stock
+
+def measure(name, records, file, flushsize):
+    formatter = create_formatter(name, file=file, flushsize=flushsize)
+    start = time.perf_counter()
+    print_table(records, ['name', 'shares', 'price'], formatter)
+    elapsed = time.perf_counter() - start
+    print('%-5s flushsize=%-6d %8.2fs %12.0f rows/sec' %
+          (name, flushsize, elapsed, len(records) / elapsed), file=sys.stderr)
+
+if __name__ == '__main__':
+    nrows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    output = sys.argv[2] if len(sys.argv) > 2 else os.devnull
+    records = [ Stock('GOOG', n % 1000 + 1, 490.1) for n in range(nrows) ]
+    with open(output, 'w') as file:
+        for name in ['text', 'csv', 'tsv', 'html']:
+            for flushsize in [1, 1000]:
+                measure(name, records, file, flushsize)
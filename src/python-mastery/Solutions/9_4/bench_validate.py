@@ -0,0 +1,42 @@
+# bench_validate.py
+#
+# Call overhead of @validated and @enforce relative to the undecorated
+# function.  Keyword calls take the Signature.bind() path.
+#
+#    python bench_validate.py [number]
+
+import sys
+from timeit import timeit
+from structly.validate import Integer, PositiveInteger, validated, enforce
+
+def add(x, y):
+    return x + y
+
+class Stock:
+    def __init__(self, shares):
+        self.shares = shares
+
+    def sell(self, nshares):
+        self.shares -= nshares
+
+def typed_add(x: Integer, y: Integer) -> Integer:
+    return x + y
+
+def typed_sell(self, nshares: PositiveInteger):
+    self.shares -= nshares
+
+cases = [
+    ('add(2, 3)', add, validated(typed_add), (2, 3), {}),
+    ('add(x=2, y=3)', add, validated(typed_add), (), {'x': 2, 'y': 3}),
+    ('enforce add(2, 3)', add, enforce(x=Integer, y=Integer, return_=Integer)(add), (2, 3), {}),
+    ('sell(s, 0)', Stock.sell, validated(typed_sell), (Stock(10**9), 0), {}),
+    ('sell(s, nshares=0)', Stock.sell, validated(typed_sell), (Stock(10**9),), {'nshares': 0}),
+]
+
+if __name__ == '__main__':
+    number = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    print('%-20s %10s %10s %8s' % ('call', 'bare', 'checked', 'ratio'))
+    for label, bare, checked, args, kwargs in cases:
+        bare_time = timeit(lambda: bare(*args, **kwargs), number=number)
+        checked_time = timeit(lambda: checked(*args, **kwargs), number=number)
+        print('%-20s %9.3fs %9.3fs %7.1fx' % (label, bare_time, checked_time, checked_time / bare_time))
@@ -0,0 +1,26 @@
+# bench_validation.py
+#
+# Bulk CSV load throughput under each validation mode
+#
+#    python bench_validation.py [nrows]
+
+import os
+import sys
+import time
+from structly import read_csv_as_instances, validation
+from stock import Stock
+from benchdata import scaled_portfolio
+
+if __name__ == '__main__':
+    nrows = int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000
+    filename = scaled_portfolio(nrows)
+    try:
+        for mode in ['full', 'sampled:100', 'off']:
+            with validation(mode):
+                start = time.perf_counter()
+                records = read_csv_as_instances(filename, Stock)
+                elapsed = time.perf_counter() - start
+            print('%-12s %10d rows %8.2fs %12.0f rows/sec' %
+                  (mode, len(records), elapsed, len(records) / elapsed))
+    finally:
+        os.remove(filename)
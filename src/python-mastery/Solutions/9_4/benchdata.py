@@ -0,0 +1,25 @@
+# benchdata.py
+#
+# Helpers for generating large input files for the benchmark scripts
+
+import os
+import tempfile
+
+def scaled_portfolio(nrows, source='../../Data/portfolio.csv'):
+    '''
+    Write a temporary CSV file with nrows rows by repeating the rows
+    of source.  Returns the filename.  The caller removes it.
+    '''
+    with open(source) as f:
+        header = next(f)
+        lines = f.readlines()
+
+    fd, filename = tempfile.mkstemp(suffix='.csv')
+    with os.fdopen(fd, 'w') as out:
+        out.write(header)
+        full, extra = divmod(nrows, len(lines))
+        chunk = ''.join(lines)
+        for _ in range(full):
+            out.write(chunk)
+        out.writelines(lines[:extra])
+    return filename
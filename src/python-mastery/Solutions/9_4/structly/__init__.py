@@ -1,9 +1,13 @@
 # structly/__init__.py
 
 from .structure import *
+from .validate import *
 from .reader import *
+from .columns import *
 from .tableformat import *
 
 __all__ = [ *structure.__all__,
+            *validate.__all__,
             *reader.__all__,
+            *columns.__all__,
             *tableformat.__all__ ]
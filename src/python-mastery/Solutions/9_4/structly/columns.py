@@ -0,0 +1,139 @@
+# columns.py
+
+__all__ = [ 'ColumnStore',
+            'csv_as_columns',
+            'read_csv_as_columns' ]
+
+import collections.abc
+import sys
+from array import array
+from .reader import iter_convert_csv
+
+# array typecodes used for each expected_type.  Anything not listed
+# is kept in a plain list.
+_typecodes = {
+    int: 'q',
+    float: 'd',
+}
+
+def _make_column(ty):
+    code = _typecodes.get(ty)
+    return array(code) if code else []
+
+class ColumnRow:
+    '''
+    Lightweight view of a single row in a ColumnStore
+    '''
+    __slots__ = ('_store', '_index')
+
+    def __init__(self, store, index):
+        self._store = store
+        self._index = index
+
+    def __getattr__(self, name):
+        try:
+            column = self._store._columns[name]
+        except KeyError:
+            raise AttributeError('No attribute %s' % name) from None
+        return column[self._index]
+
+    def __iter__(self):
+        for column in self._store._columns.values():
+            yield column[self._index]
+
+    def __len__(self):
+        return len(self._store._columns)
+
+    def __repr__(self):
+        return '%s(%s)' % (self._store.cls.__name__,
+                           ', '.join(repr(val) for val in self))
+
+    def __eq__(self, other):
+        return tuple(self) == tuple(other)
+
+class ColumnStore(collections.abc.Sequence):
+    '''
+    Store records of a Structure subclass as one array per field
+    '''
+    def __init__(self, cls):
+        self.cls = cls
+        self._columns = { name: _make_column(ty)
+                          for name, ty in zip(cls._fields, cls._types) }
+
+    def __len__(self):
+        return len(next(iter(self._columns.values()), ()))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            store = ColumnStore(self.cls)
+            store._columns = { name: column[index]
+                               for name, column in self._columns.items() }
+            return store
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('ColumnStore index out of range')
+        return ColumnRow(self, index)
+
+    def column(self, name):
+        '''
+        Return the underlying array (or list) for a field
+        '''
+        return self._columns[name]
+
+    def append(self, rowdata):
+        '''
+        Append one row of already converted values in _fields order
+        '''
+        if len(rowdata) != len(self._columns):
+            # Appending part of a row would misalign the columns
+            raise ValueError('Expected %d values, got %d' % (len(self._columns), len(rowdata)))
+        for column, val in zip(self._columns.values(), rowdata):
+            column.append(val)
+
+    def extend(self, rows):
+        if isinstance(rows, ColumnStore) and rows.cls is self.cls:
+            # Column-wise bulk copy
+            for name, column in self._columns.items():
+                column.extend(rows._columns[name])
+        else:
+            # append() inlined
+            columns = list(self._columns.values())
+            ncolumns = len(columns)
+            for rowdata in rows:
+                if len(rowdata) != ncolumns:
+                    raise ValueError('Expected %d values, got %d' % (ncolumns, len(rowdata)))
+                for column, val in zip(columns, rowdata):
+                    column.append(val)
+
+    def instance(self, index):
+        '''
+        Materialize a single row as a full Structure instance
+        '''
+        return self.cls(*self[index])
+
+    def row_converter(self):
+        '''
+        Make a convert_csv converter that type-converts and validates a
+        row without creating an instance.
+        '''
+        checks = [ getattr(self.cls, name).flat_check for name in self.cls._fields ]
+        types = [ sys.intern if ty is str else ty for ty in self.cls._types ]
+        nfields = len(checks)
+        def converter(headers, row):
+            if len(row) != nfields:
+                raise ValueError('Expected %d values, got %d' % (nfields, len(row)))
+            return [ check(func(val)) for check, func, val in zip(checks, types, row) ]
+        return converter
+
+def csv_as_columns(lines, cls, *, headers=None):
+    store = ColumnStore(cls)
+    store.extend(iter_convert_csv(lines, store.row_converter(), headers=headers))
+    return store
+
+def read_csv_as_columns(filename, cls, *, headers=None):
+    '''
+    Read CSV data into a ColumnStore of cls records
+    '''
+    with open(filename) as file:
+        return csv_as_columns(file, cls, headers=headers)
@@ -1,31 +1,56 @@
 # reader.py
 
+__all__ = [ 'read_csv_as_dicts',
+            'read_csv_as_instances',
+            'iter_csv_as_dicts',
+            'iter_csv_as_instances',
+            'read_csv_parallel' ]
+
 import csv
+import io
 import logging
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
 log = logging.getLogger(__name__)
 
-def convert_csv(lines, converter, *, headers=None):
+def iter_convert_csv(lines, converter, *, headers=None):
+    '''
+    Lazily convert CSV lines, producing one converted record at a time
+    '''
     rows = csv.reader(lines)
     if headers is None:
-        headers = next(rows)
+        headers = next(rows, None)
+        if headers is None:
+            return
 
-    records = []
     for rowno, row in enumerate(rows, start=1):
         try:
-            records.append(converter(headers, row))
+            record = converter(headers, row)
         except ValueError as e:
-            log.warning('Row %s: Bad row: %s', rowno, row)
-            log.debug('Row %s: Reason: %s', rowno, row)
-    return records
+            _log_bad_row(rowno, row, e)
+            continue
+        yield record
+
+def _log_bad_row(rowno, row, reason):
+    log.warning('Row %s: Bad row: %s', rowno, row)
+    log.debug('Row %s: Reason: %s', rowno, reason)
+
+def convert_csv(lines, converter, *, headers=None):
+    return list(iter_convert_csv(lines, converter, headers=headers))
+
+def _dict_converter(types):
+    return lambda headers, row: { name: func(val) for name, func, val in zip(headers, types, row) }
+
+def _instance_converter(cls):
+    return lambda headers, row: cls.from_row(row)
 
 def csv_as_dicts(lines, types, *, headers=None):
-    return convert_csv(lines, 
-                       lambda headers, row: { name: func(val) for name, func, val in zip(headers, types, row) })
+    return convert_csv(lines, _dict_converter(types), headers=headers)
 
 def csv_as_instances(lines, cls, *, headers=None):
-    return convert_csv(lines,
-                       lambda headers, row: cls.from_row(row))
+    return convert_csv(lines, _instance_converter(cls), headers=headers)
 
 def read_csv_as_dicts(filename, types, *, headers=None):
     '''
@@ -41,3 +66,96 @@ def read_csv_as_instances(filename, cls, *, headers=None):
     with open(filename) as file:
         return csv_as_instances(file, cls, headers=headers)
 
+def iter_csv_as_dicts(filename, types, *, headers=None):
+    '''
+    Generate dictionaries from CSV data one row at a time
+    '''
+    with open(filename) as file:
+        yield from iter_convert_csv(file, _dict_converter(types), headers=headers)
+
+def iter_csv_as_instances(filename, cls, *, headers=None):
+    '''
+    Generate instances from CSV data one row at a time
+    '''
+    with open(filename) as file:
+        yield from iter_convert_csv(file, _instance_converter(cls), headers=headers)
+
+def _chunk_bounds(filename, nchunks, skip_header):
+    '''
+    Split a file into at most nchunks byte ranges that start and end on
+    line boundaries.  Returns a list of offsets.
+    '''
+    with open(filename, 'rb') as f:
+        if skip_header:
+            f.readline()
+        start = f.tell()
+        size = f.seek(0, os.SEEK_END)
+        bounds = [ start ]
+        for n in range(1, nchunks):
+            pos = start + (size - start) * n // nchunks
+            if pos <= bounds[-1]:
+                continue
+            f.seek(pos)
+            f.readline()        # Advance to the start of the next line
+            pos = f.tell()
+            if pos >= size:
+                break
+            if pos > bounds[-1]:
+                bounds.append(pos)
+        bounds.append(size)
+    return bounds
+
+def _parse_chunk(filename, start, end, cls, as_columns):
+    '''
+    Worker: convert the rows in one byte range of a file.  Bad rows are
+    returned (numbered within the chunk) rather than logged, so that the
+    parent process can report them with global row numbers.
+    '''
+    with open(filename, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    rows = csv.reader(io.TextIOWrapper(io.BytesIO(data)))
+
+    if as_columns:
+        from .columns import ColumnStore
+        records = ColumnStore(cls)
+        convert = records.row_converter()
+    else:
+        records = []
+        convert = _instance_converter(cls)
+
+    bad = []
+    rowno = 0
+    for rowno, row in enumerate(rows, start=1):
+        try:
+            records.append(convert(None, row))
+        except ValueError as e:
+            bad.append((rowno, row, str(e)))
+    return records, rowno, bad
+
+def read_csv_parallel(filename, cls, *, headers=None, workers=None, as_columns=False):
+    '''
+    Read CSV data into a list of instances (or a ColumnStore if
+    as_columns is set), parsing chunks of the file in a pool of worker
+    processes.  Records are returned in file order.  The file is split
+    on newlines, so quoted fields must not contain line breaks.
+    '''
+    nchunks = (workers or os.cpu_count() or 1) * 4
+    bounds = _chunk_bounds(filename, nchunks, skip_header=headers is None)
+
+    if as_columns:
+        from .columns import ColumnStore
+        records = ColumnStore(cls)
+    else:
+        records = []
+
+    with ProcessPoolExecutor(workers) as pool:
+        results = pool.map(_parse_chunk, repeat(filename), bounds[:-1], bounds[1:],
+                           repeat(cls), repeat(as_columns))
+        offset = 0
+        for chunk, nrows, bad in results:
+            for rowno, row, reason in bad:
+                _log_bad_row(offset + rowno, row, reason)
+            records.extend(chunk)
+            offset += nrows
+    return records
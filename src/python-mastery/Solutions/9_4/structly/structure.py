@@ -2,22 +2,54 @@
 
 __all__ = [ 'Structure' ]
 
-from .validate import Validator, validated
+from . import validate
+from .validate import Validator, validated, parse_validation, make_skip
 from collections import ChainMap
+from weakref import WeakSet
+
+class SlotField:
+    '''
+    Descriptor that validates through a Validator, but stores the
+    value in a private __slots__ member instead of the instance __dict__
+    '''
+    __slots__ = ('validator', 'member')
+
+    def __init__(self, validator, member):
+        self.validator = validator
+        self.member = member
+
+    def __get__(self, instance, cls):
+        if instance is None:
+            return self.validator
+        return self.member.__get__(instance, cls)
+
+    def __set__(self, instance, value):
+        self.member.__set__(instance, self.validator.flat_check(value))
 
 class StructureMeta(type):
     @classmethod
-    def __prepare__(meta, clsname, bases):
+    def __prepare__(meta, clsname, bases, **kwargs):
         return ChainMap({}, Validator.validators)
         
     @staticmethod
-    def __new__(meta, name, bases, methods):
+    def __new__(meta, name, bases, methods, *, slots=False, validation=None):
         methods = methods.maps[0]
+        # class Name(Structure, slots=True) keeps each validated field
+        # in a private __slots__ member instead of __dict__
+        if slots:
+            methods['__slots__'] = tuple('_' + key for key, val in methods.items()
+                                         if isinstance(val, Validator))
+        # class Name(Structure, validation='off') overrides the process-wide
+        # validation mode for this class
+        if validation is not None:
+            methods['_validation'] = parse_validation(validation)
         return super().__new__(meta, name, bases, methods)
 
 class Structure(metaclass=StructureMeta):
+    __slots__ = ()
     _fields = ()
     _types = ()
+    _validation = None
 
     def __setattr__(self, name, value):
         if name.startswith('_') or name in self._fields:
@@ -47,17 +79,149 @@ class Structure(metaclass=StructureMeta):
         Create an __init__ method from _fields
         '''
         args = ','.join(cls._fields)
+        env = { }
+        checked = _store_values(cls, env, _checked_values(cls, env, cls._fields))
+        plain = _store_values(cls, env, cls._fields)
         code = f'def __init__(self, {args}):\n'
-        for name in cls._fields:
-            code += f'    self.{name} = {name}\n'
-        locs = { }
-        exec(code, locs)
-        cls.__init__ = locs['__init__']
+        code += _validation_code(cls, env, checked, plain)
+        exec(code, env)
+        cls.__init__ = env['__init__']
+
+    @classmethod
+    def create_from_row(cls):
+        '''
+        Create a specialized from_row() method from _fields and _types
+        with the type conversions and validator checks unrolled
+        '''
+        env = { '_new': object.__new__ }
+        converted = []
+        for n, (name, func) in enumerate(zip(cls._fields, cls._types)):
+            if func is _identity:
+                converted.append(f'row[{n}]')
+            else:
+                env[f'_type_{name}'] = func
+                converted.append(f'_type_{name}(row[{n}])')
+        values = _checked_values(cls, env, converted)
+
+        code = 'def from_row(cls, row):\n'
+        code += '    self = _new(cls)\n'
+        code += _validation_code(cls, env, _store_values(cls, env, values),
+                                 _store_values(cls, env, converted))
+        code += '    return self\n'
+        exec(code, env)
+        cls.from_row = classmethod(env['from_row'])
+
+    @classmethod
+    def create_setattr(cls):
+        '''
+        Create a __setattr__ method that skips the validators on fields
+        when validation is off or sampled
+        '''
+        mode, rate = cls.validation_mode()
+        if mode == 'full':
+            if '__setattr__' in vars(cls):
+                del cls.__setattr__
+            # Don't inherit a parent's skipping __setattr__ either
+            for base in cls.__mro__:
+                setattr_ = vars(base).get('__setattr__')
+                if setattr_ and not getattr(setattr_, '_skips_validation', False):
+                    break
+            if cls.__setattr__ is not setattr_:
+                cls.__setattr__ = setattr_
+            return
+
+        skip = make_skip(mode, rate)
+        fields = frozenset(cls._fields)
+        checked_setattr = Structure.__setattr__
+        if cls._slotted:
+            setters = { name: vars(cls)['_' + name].__set__ for name in cls._fields }
+            def store(self, name, value):
+                setters[name](self, value)
+        else:
+            def store(self, name, value):
+                self.__dict__[name] = value
+
+        def __setattr__(self, name, value):
+            if name in fields and skip():
+                store(self, name, value)
+            else:
+                checked_setattr(self, name, value)
+        __setattr__._skips_validation = True
+        cls.__setattr__ = __setattr__
+
+    @classmethod
+    def validation_mode(cls):
+        '''
+        The (mode, rate) validation setting in effect for this class
+        '''
+        return cls._validation or (validate._validation.mode, validate._validation.rate)
 
     @classmethod
     def __init_subclass__(cls):
         # Apply the validated decorator to subclasses
         validate_attributes(cls)
+        if cls._slotted:
+            # Route the validators to their private __slots__ members
+            for name in cls._fields:
+                setattr(cls, name, SlotField(vars(cls)[name], vars(cls)['_' + name]))
+
+def _identity(x):
+    return x
+
+def _checked_values(cls, env, values):
+    '''
+    Source expressions passing values (in _fields order) through the
+    field validators.  Checks are made here rather than by assigning
+    attributes, so a sampling __setattr__ doesn't sample them again.
+    '''
+    for name in cls._fields:
+        env[f'_check_{name}'] = getattr(cls, name).flat_check
+    return [ f'_check_{name}({value})' for name, value in zip(cls._fields, values) ]
+
+def _store_values(cls, env, values):
+    '''
+    Statements that store values (source expressions in _fields order)
+    on self without going through the validators
+    '''
+    if cls._slotted:
+        for name in cls._fields:
+            env[f'_set_{name}'] = vars(cls)['_' + name].__set__
+        return [ f'_set_{name}(self, {value})' for name, value in zip(cls._fields, values) ]
+    items = [ f"'{name}': {value}" for name, value in zip(cls._fields, values) ]
+    return [ 'self.__dict__.update({%s})' % ', '.join(items) ]
+
+def _validation_code(cls, env, checked, plain):
+    '''
+    Method body using the checked or plain statements (or, for sampled
+    validation, choosing between them) per the class's validation mode
+    '''
+    mode, rate = cls.validation_mode()
+    if mode == 'full':
+        return ''.join(f'    {line}\n' for line in checked)
+    if mode == 'off':
+        return ''.join(f'    {line}\n' for line in plain)
+    env['_skip'] = make_skip(mode, rate)
+    return ('    if _skip():\n' +
+            ''.join(f'        {line}\n' for line in plain) +
+            '    else:\n' +
+            ''.join(f'        {line}\n' for line in checked))
+
+# Structure classes whose methods depend on the process-wide validation mode
+_structures = WeakSet()
+
+def _create_methods(cls):
+    cls.create_init()
+    if 'from_row' in cls._generated:
+        cls.create_from_row()
+    if '__setattr__' in cls._generated:
+        cls.create_setattr()
+
+def _validation_changed():
+    for cls in list(_structures):
+        if cls._validation is None:
+            _create_methods(cls)
+
+validate._listeners.append(_validation_changed)
 
 def validate_attributes(cls):
     '''
@@ -76,14 +240,22 @@ def validate_attributes(cls):
     # Collect all of the field names
     cls._fields = tuple([v.name for v in validators])
 
-    # Collect type conversions. The lambda x:x is an identity
-    # function that's used in case no expected_type is found.
-    cls._types = tuple([ getattr(v, 'expected_type', lambda x: x)
+    # Fields stored in __slots__ (see StructureMeta)
+    cls._slotted = bool(cls._fields) and \
+        all('_' + name in vars(cls).get('__slots__', ()) for name in cls._fields)
+
+    # Collect type conversions. _identity is used in case no
+    # expected_type is found.
+    cls._types = tuple([ getattr(v, 'expected_type', _identity)
                    for v in validators ])
 
-    # Create the __init__ method
+    # Create the __init__, from_row and __setattr__ methods.  Methods the
+    # class defines itself are left alone.
     if cls._fields:
-        cls.create_init()
+        cls._generated = { name for name in ('from_row', '__setattr__')
+                           if name not in vars(cls) }
+        _create_methods(cls)
+        _structures.add(cls)
 
     
     return cls
@@ -1,5 +1,5 @@
 # __init__.py
 
-from .formatter import print_table, create_formatter
+from .formatter import print_table, create_formatter, available_formats
 
-__all__ = [ 'print_table', 'create_formatter' ]
+__all__ = [ 'print_table', 'create_formatter', 'available_formats' ]
@@ -4,7 +4,10 @@ from ..formatter import TableFormatter
 
 class CSVTableFormatter(TableFormatter):
     def headings(self, headers):
-        print(','.join(headers))
+        self.write(','.join(headers))
 
     def row(self, rowdata):
-        print(','.join(str(d) for d in rowdata))
+        self.write(','.join(map(str, rowdata)))
+
+    def row_template(self, cells):
+        return ','.join(cells)
@@ -4,13 +4,10 @@ from ..formatter import TableFormatter
 
 class HTMLTableFormatter(TableFormatter):
     def headings(self, headers):
-        print('<tr>', end=' ')
-        for h in headers:
-            print('<th>%s</th>' % h, end=' ')
-        print('</tr>')
+        self.write('<tr> ' + ''.join('<th>%s</th> ' % h for h in headers) + '</tr>')
 
     def row(self, rowdata):
-        print('<tr>', end=' ')
-        for d in rowdata:
-            print('<td>%s</td>' % d, end=' ')
-        print('</tr>')
+        self.write('<tr> ' + ''.join('<td>%s</td> ' % d for d in rowdata) + '</tr>')
+
+    def row_template(self, cells):
+        return '<tr> ' + ''.join('<td>%s</td> ' % c for c in cells) + '</tr>'
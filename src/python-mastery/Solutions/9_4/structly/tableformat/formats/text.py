@@ -3,9 +3,14 @@
 from ..formatter import TableFormatter
 
 class TextTableFormatter(TableFormatter):
+    cell = '%10s'
+
     def headings(self, headers):
-        print(' '.join('%10s' % h for h in headers))
-        print(('-'*10 + ' ')*len(headers))
+        self.write(' '.join('%10s' % h for h in headers))
+        self.write(('-'*10 + ' ')*len(headers))
     
     def row(self, rowdata):
-        print(' '.join('%10s' % d for d in rowdata))
+        self.write(' '.join('%10s' % d for d in rowdata))
+
+    def row_template(self, cells):
+        return ' '.join(cells)
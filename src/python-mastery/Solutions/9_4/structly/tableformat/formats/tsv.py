@@ -4,6 +4,8 @@ from ..formatter import TableFormatter
 
 class TSVTableFormatter(TableFormatter):
     def headings(self, headers):
-        print('\t'.join(headers))
+        self.write('\t'.join(headers))
     def row(self, rowdata):
-        print('\t'.join(str(d) for d in rowdata))
+        self.write('\t'.join(map(str, rowdata)))
+    def row_template(self, cells):
+        return '\t'.join(cells)
@@ -1,22 +1,82 @@
 # tableformat.py
+import pkgutil
+import re
+import sys
 from abc import ABC, abstractmethod
+from functools import lru_cache
+from importlib import import_module
+from importlib.metadata import entry_points
+from operator import attrgetter
+from types import ModuleType
+
+# Lines print_table() collects per write when the formatter has no flushsize
+PRINT_TABLE_FLUSHSIZE = 1000
 
 def print_table(records, fields, formatter):
     if not isinstance(formatter, TableFormatter):
         raise RuntimeError('Expected a TableFormatter')
 
+    flushsize = formatter.flushsize
+    if flushsize is None:
+        formatter.flushsize = PRINT_TABLE_FLUSHSIZE
+    try:
+        _print_rows(records, fields, formatter)
+    finally:
+        formatter.flush()
+        formatter.flushsize = flushsize
+
+def _print_rows(records, fields, formatter):
     formatter.headings(fields)
+    if len(fields) == 1:
+        getter = attrgetter(fields[0])
+        rowdata = lambda r: (getter(r),)
+    elif fields:
+        rowdata = attrgetter(*fields)
+    else:
+        rowdata = lambda r: ()
+    writerow = formatter.compile_row(len(fields))
     for r in records:
-        rowdata = [getattr(r, fieldname) for fieldname in fields]
-        formatter.row(rowdata)
+        writerow(rowdata(r))
 
 class TableFormatter(ABC):
     _formats = { }
+    cell = '%s'         # % format applied to each cell of a row
+
+    def __init__(self, file=None, flushsize=None):
+        '''
+        Output lines are written to file (default sys.stdout).  With a
+        flushsize, they are collected and written in batches of that many
+        lines; call flush(), or use the formatter in a with statement, to
+        write out any lines still buffered.  Without one, each line is
+        written at once, except that print_table() batches its own output.
+        '''
+        self.file = file
+        self.flushsize = flushsize
+        self._lines = []
+
+    def write(self, line):
+        self._lines.append(line)
+        if self.flushsize is None or len(self._lines) >= self.flushsize:
+            self.flush()
+
+    def flush(self):
+        if self._lines:
+            self._lines.append('')
+            (self.file or sys.stdout).write('\n'.join(self._lines))
+            self._lines.clear()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.flush()
 
     @classmethod
     def __init_subclass__(cls):
-        name = cls.__module__.split('.')[-1]
-        TableFormatter._formats[name] = cls
+        # Mixin combinations made by create_formatter() aren't formats
+        if cls.__module__ != __name__:
+            name = cls.__module__.split('.')[-1]
+            TableFormatter._formats[name] = cls
 
     @abstractmethod
     def headings(self, headers):
@@ -26,23 +86,127 @@ class TableFormatter(ABC):
     def row(self, rowdata):
         pass
 
+    def row_template(self, cells):
+        '''
+        Join a list of per-cell % formats into a single format string
+        for a whole row.  Formatters that can't do this return None.
+        '''
+        return None
+
+    def compile_row(self, ncols):
+        '''
+        Return a function that outputs a row given as a tuple of ncols
+        values, using a single % operation per row when possible.
+        '''
+        if not _template_matches_row(type(self), type(self).row):
+            return self.row
+        template = self.row_template([self.cell] * ncols)
+        if template is None:
+            return self.row
+        write = self.write
+        return lambda rowdata: write(template % rowdata)
+
+def _template_matches_row(cls, row):
+    '''
+    Check that row() is the method defined next to the row_template()
+    used by cls.  A subclass overriding row() alone would otherwise have
+    its row() bypassed by the template.
+    '''
+    for base in cls.__mro__:
+        if 'row_template' in vars(base):
+            return vars(base).get('row') is row
+    return False
+
 class ColumnFormatMixin:
     formats = []
     def row(self, rowdata):
         rowdata = [ (fmt % item) for fmt, item in zip(self.formats, rowdata)]
         super().row(rowdata)
 
+    def compile_row(self, ncols):
+        if (type(self).row is not ColumnFormatMixin.row or
+            not _template_matches_row(type(self), super().row.__func__)):
+            return self.row
+        cells = [ _merge_format(self.cell, fmt) for fmt in self.formats ]
+        template = None
+        if len(cells) == ncols and None not in cells:
+            template = self.row_template(cells)
+        if template is None:
+            return self.row
+        write = self.write
+        return lambda rowdata: write(template % rowdata)
+
+# A single % conversion such as '%d', '%0.2f' or '%10s'
+_conversion = re.compile(r'%([-#0 +]*)(\d*)(\.\d+)?([diouxXeEfFgGcrsa])$')
+
+def _merge_format(cell, fmt):
+    '''
+    Combine a formatter cell format (e.g. '%10s') and a column format
+    (e.g. '%0.2f') into one format with the same output ('%10.2f').
+    Returns None if that isn't possible.
+    '''
+    outer = _conversion.match(cell)
+    inner = _conversion.match(fmt)
+    if not outer or not inner or outer[1] or outer[3] or outer[4] != 's':
+        return None
+    width = outer[2]
+    if not width:
+        return fmt
+    flags, fmtwidth, precision, conversion = inner.groups()
+    if fmtwidth or '-' in flags:
+        return None
+    # A 0 flag has no effect without a width, so it must not pick up ours
+    return '%' + flags.replace('0', '') + width + (precision or '') + conversion
+
 class UpperHeadersMixin:
     def headings(self, headers):
         super().headings([h.upper() for h in headers])
 
-def create_formatter(name, column_formats=None, upper_headers=False):
+# Third party formats are registered under this entry point group.  The
+# entry point may name a TableFormatter subclass or a module defining one.
+ENTRY_POINT_GROUP = 'structly.formats'
+
+@lru_cache(maxsize=None)
+def _builtin_formats():
+    '''
+    Names of the modules in the formats package (found without importing them)
+    '''
+    from . import formats
+    return tuple(info.name for info in pkgutil.iter_modules(formats.__path__))
+
+@lru_cache(maxsize=None)
+def _plugin_formats():
+    return { ep.name: ep for ep in entry_points(group=ENTRY_POINT_GROUP) }
+
+def available_formats():
+    '''
+    Return the names of all formats usable with create_formatter()
+    '''
+    return sorted({ *_builtin_formats(), *_plugin_formats(), *TableFormatter._formats })
+
+def _find_format(name):
     if name not in TableFormatter._formats:
-        __import__(f'{__package__}.formats.{name}')
-        
+        if name in _builtin_formats():
+            import_module(f'{__package__}.formats.{name}')
+        elif name in _plugin_formats():
+            loaded = _plugin_formats()[name].load()
+            if isinstance(loaded, ModuleType):
+                # Importing the module registered its formatter under
+                # the module's own name
+                loaded = TableFormatter._formats.get(loaded.__name__.split('.')[-1])
+            if isinstance(loaded, type) and issubclass(loaded, TableFormatter):
+                TableFormatter._formats[name] = loaded
     formatter_cls = TableFormatter._formats.get(name)
     if not formatter_cls:
         raise RuntimeError('Unknown format %s' % name)
+    return formatter_cls
+
+@lru_cache(maxsize=None)
+def _formatter_class(name, column_formats, upper_headers):
+    '''
+    Build (once) the formatter class for a given set of options
+    '''
+    formatter_cls = _find_format(name)
 
     if column_formats:
         class formatter_cls(ColumnFormatMixin, formatter_cls):
@@ -52,7 +216,11 @@ def create_formatter(name, column_formats=None, upper_headers=False):
         class formatter_cls(UpperHeadersMixin, formatter_cls):
             pass
 
-    return formatter_cls()
-
-
+    return formatter_cls
 
+def create_formatter(name, column_formats=None, upper_headers=False, *,
+                     file=None, flushsize=None):
+    if column_formats:
+        column_formats = tuple(column_formats)
+    formatter_cls = _formatter_class(name, column_formats or None, bool(upper_headers))
+    return formatter_cls(file=file, flushsize=flushsize)
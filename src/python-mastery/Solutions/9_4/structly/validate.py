@@ -1,5 +1,11 @@
 # validate.py
 
+__all__ = [ 'set_validation', 'get_validation', 'validation' ]
+
+import os
+from contextlib import contextmanager
+from itertools import count
+
 class Validator:
     def __init__(self, name=None):
         self.name = name
@@ -7,21 +13,64 @@ class Validator:
     def __set_name__(self, cls, name):
         self.name = name
 
+    # Source of the test made by check(), used to build flat_check.
+    # Class attributes (e.g. expected_type) can be used as plain names.
+    check_code = ''
+
     @classmethod
     def check(cls, value):
         return value
 
     def __set__(self, instance, value):
-        instance.__dict__[self.name] = self.check(value)
+        instance.__dict__[self.name] = self.flat_check(value)
 
     # Collect all derived classes into a dict
     validators = { }
     @classmethod
     def __init_subclass__(cls):
         cls.validators[cls.__name__] = cls
+        flat_check = _flatten_check(cls)
+        cls.flat_check = staticmethod(flat_check) if flat_check else _UnflattenedCheck()
+
+class _UnflattenedCheck:
+    '''
+    flat_check for a validator that can't be flattened.  It is just the
+    validator's own check(), bound to the instance when there is one.
+    '''
+    def __get__(self, instance, cls):
+        return (cls if instance is None else instance).check
+
+def _flatten_check(cls):
+    '''
+    Build a single function doing the same work as cls.check(), with the
+    tests of every check() in the MRO inlined in order instead of chained
+    through super().  Returns None if some class in the MRO defines check()
+    without check_code, or not as a classmethod (e.g. a check() using
+    instance attributes).
+    '''
+    lines = [ ]
+    for base in cls.__mro__:
+        if 'check' not in vars(base):
+            continue
+        if 'check_code' not in vars(base) or not isinstance(vars(base)['check'], classmethod):
+            return None
+        lines.extend(vars(base)['check_code'].strip().splitlines())
+
+    env = { name: getattr(cls, name) for name in dir(cls) if not name.startswith('_') }
+    code = 'def flat_check(value):\n'
+    code += ''.join(f'    {line}\n' for line in lines)
+    code += '    return value\n'
+    exec(code, env)
+    return env['flat_check']
+
+Validator.flat_check = staticmethod(_flatten_check(Validator))
 
 class Typed(Validator):
     expected_type = object
+    check_code = '''
+if not isinstance(value, expected_type):
+    raise TypeError(f'expected {expected_type}')
+'''
     @classmethod
     def check(cls, value):
         if not isinstance(value, cls.expected_type):
@@ -37,6 +86,10 @@ globals().update((name, type(name, (Typed,), {'expected_type':ty}))
                  for name, ty in _typed_classes)
 
 class Positive(Validator):
+    check_code = '''
+if value < 0:
+    raise ValueError('must be >= 0')
+'''
     @classmethod
     def check(cls, value):
         if value < 0:
@@ -44,6 +97,10 @@ class Positive(Validator):
         return super().check(value)
 
 class NonEmpty(Validator):
+    check_code = '''
+if len(value) == 0:
+    raise ValueError('must be non-empty')
+'''
     @classmethod
     def check(cls, value):
         if len(value) == 0:
@@ -59,33 +116,95 @@ class PositiveFloat(Float, Positive):
 class NonEmptyString(String, NonEmpty):
     pass
 
-from inspect import signature
+# Validation modes.  'full' checks every value, 'off' skips the checks
+# and 'sampled:N' checks one value in every N.  The process-wide mode
+# comes from the STRUCTLY_VALIDATION environment variable and can be
+# changed with set_validation() or the validation() context manager.
+
+def parse_validation(spec):
+    '''
+    Parse a validation mode such as 'full', 'off' or 'sampled:100'
+    into a (mode, rate) tuple
+    '''
+    mode, _, rate = spec.strip().lower().partition(':')
+    if mode not in ('full', 'sampled', 'off') or (rate and mode != 'sampled'):
+        raise ValueError(f'Bad validation mode {spec!r}')
+    rate = int(rate or 100)
+    if rate < 1:
+        raise ValueError(f'Bad sampling rate {rate}')
+    return mode, rate
+
+def make_skip(mode, rate):
+    '''
+    Return a function telling whether the next check should be skipped,
+    or None if checks are never skipped
+    '''
+    if mode == 'full':
+        return None
+    if mode == 'off':
+        return lambda: True
+    counter = count()
+    return lambda: next(counter) % rate != 0
+
+class _Validation:
+    mode = 'full'
+    rate = 100
+    skip = None
+
+_validation = _Validation()
+
+# Functions called after the process-wide mode changes
+_listeners = [ ]
+
+def get_validation():
+    if _validation.mode == 'sampled':
+        return f'sampled:{_validation.rate}'
+    return _validation.mode
+
+def set_validation(spec):
+    _validation.mode, _validation.rate = parse_validation(spec)
+    _validation.skip = make_skip(_validation.mode, _validation.rate)
+    for func in _listeners:
+        func()
+
+@contextmanager
+def validation(spec):
+    old = get_validation()
+    set_validation(spec)
+    try:
+        yield
+    finally:
+        set_validation(old)
+
+set_validation(os.environ.get('STRUCTLY_VALIDATION', 'full'))
+
+from inspect import signature, Parameter
 from functools import wraps
 
 def isvalidator(item):
     return isinstance(item, type) and issubclass(item, Validator)
 
-def validated(func):
+def _checked(func, annotations, retcheck, indent):
+    '''
+    Wrap func so that the given validators (name -> Validator) are checked
+    on every call.  The wrapper is generated with exec so that a call passing
+    every parameter positionally only indexes args.  Other calls go through
+    Signature.bind().
+    '''
     sig = signature(func)
 
-    # Gather the function annotations
-    annotations = { name:val for name, val in func.__annotations__.items()
-                    if isvalidator(val) }
-
-    # Get the return annotation (if any)
-    retcheck = annotations.pop('return', None)
-
-    @wraps(func)
     def wrapper(*args, **kwargs):
+        if _validation.skip and _validation.skip():
+            return func(*args, **kwargs)
         bound = sig.bind(*args, **kwargs)
         errors = []
 
         # Enforce argument checks
         for name, validator in annotations.items():
             try:
-                validator.check(bound.arguments[name])
+                validator.flat_check(bound.arguments[name])
             except Exception as e:
-                errors.append(f'  {name}: {e}')
+                errors.append(f'{indent}{name}: {e}')
 
         if errors:
             raise TypeError('Bad Arguments\n' + '\n'.join(errors))
@@ -95,43 +214,61 @@ def validated(func):
         # Enforce return check (if any)
         if retcheck:
             try:
-                retcheck.check(result)
+                retcheck.flat_check(result)
             except Exception as e:
                 raise TypeError(f'Bad return: {e}') from None
         return result
 
-    return wrapper
+    params = list(sig.parameters.values())
+    names = [ p.name for p in params ]
+    if not (all(p.kind in (Parameter.POSITIONAL_ONLY, Parameter.POSITIONAL_OR_KEYWORD)
+                for p in params) and set(annotations) <= set(names)):
+        return wraps(func)(wrapper)
+
+    env = { '_bind_wrapper': wrapper, '_func': func, '_validation': _validation }
+    code = 'def wrapper(*args, **kwargs):\n'
+    code += f'    if kwargs or len(args) != {len(params)}:\n'
+    code += '        return _bind_wrapper(*args, **kwargs)\n'
+    code += '    if _validation.skip and _validation.skip():\n'
+    code += '        return _func(*args)\n'
+    code += '    errors = None\n'
+    for n, (name, validator) in enumerate(annotations.items()):
+        env[f'_check_{n}'] = validator.flat_check
+        code += '    try:\n'
+        code += f'        _check_{n}(args[{names.index(name)}])\n'
+        code += '    except Exception as e:\n'
+        code += '        errors = errors or []\n'
+        code += f'        errors.append({indent + name + ": "!r} + str(e))\n'
+    code += '    if errors:\n'
+    code += "        raise TypeError('Bad Arguments\\n' + '\\n'.join(errors))\n"
+    if retcheck:
+        env['_retcheck'] = retcheck.flat_check
+        code += '    result = _func(*args)\n'
+        code += '    try:\n'
+        code += '        _retcheck(result)\n'
+        code += '    except Exception as e:\n'
+        code += "        raise TypeError(f'Bad return: {e}') from None\n"
+        code += '    return result\n'
+    else:
+        code += '    return _func(*args)\n'
+    exec(code, env)
+    return wraps(func)(env['wrapper'])
+
+def validated(func):
+    # Gather the function annotations
+    annotations = { name:val for name, val in func.__annotations__.items()
+                    if isvalidator(val) }
+
+    # Get the return annotation (if any)
+    retcheck = annotations.pop('return', None)
+
+    return _checked(func, annotations, retcheck, '  ')
 
 def enforce(**annotations):
     retcheck = annotations.pop('return_', None)
 
     def decorate(func):
-        sig = signature(func)
-
-        @wraps(func)
-        def wrapper(*args, **kwargs):
-            bound = sig.bind(*args, **kwargs)
-            errors = []
-
-            # Enforce argument checks
-            for name, validator in annotations.items():
-                try:
-                    validator.check(bound.arguments[name])
-                except Exception as e:
-                    errors.append(f'    {name}: {e}')
-
-            if errors:
-                raise TypeError('Bad Arguments\n' + '\n'.join(errors))
-
-            result = func(*args, **kwargs)
-
-            if retcheck:
-                try:
-                    retcheck.check(result)
-                except Exception as e:
-                    raise TypeError(f'Bad return: {e}') from None
-            return result
-        return wrapper
+        return _checked(func, annotations, retcheck, '    ')
     return decorate
 
 # Examples
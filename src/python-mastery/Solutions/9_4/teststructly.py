@@ -0,0 +1,414 @@
+# teststructly.py
+
+import io
+import tempfile
+import unittest
+from importlib.metadata import EntryPoint
+from unittest import mock
+from structly import *
+from structly.tableformat import formatter
+from structly.validate import Validator, Integer, PositiveInteger, NonEmptyString, validated, enforce
+from structly.tableformat.formatter import TableFormatter
+from stock import Stock
+
+class TestStructure(unittest.TestCase):
+    def test_from_row(self):
+        s = Stock.from_row(['GOOG', '100', '490.1'])
+        self.assertEqual(s, Stock('GOOG', 100, 490.1))
+        self.assertEqual(vars(s), {'name': 'GOOG', 'shares': 100, 'price': 490.1})
+
+    def test_from_row_badvalue(self):
+        with self.assertRaises(ValueError):
+            Stock.from_row(['GOOG', '-100', '490.1'])
+        with self.assertRaises(ValueError):
+            Stock.from_row(['GOOG', 'x', '490.1'])
+
+    def test_from_row_override(self):
+        class Point(Structure):
+            x = Integer()
+            y = Integer()
+            @classmethod
+            def from_row(cls, row):
+                return cls(*map(int, reversed(row)))
+        self.assertEqual(tuple(Point.from_row(['1', '2'])), (2, 1))
+
+class SlotStock(Structure, slots=True):
+    name = String()
+    shares = PositiveInteger()
+    price = PositiveFloat()
+
+class TestSlots(unittest.TestCase):
+    def test_create(self):
+        s = SlotStock('GOOG', 100, 490.1)
+        self.assertEqual(tuple(s), ('GOOG', 100, 490.1))
+        self.assertFalse(hasattr(s, '__dict__'))
+        self.assertEqual(SlotStock.__slots__, ('_name', '_shares', '_price'))
+
+    def test_from_row(self):
+        s = SlotStock.from_row(['GOOG', '100', '490.1'])
+        self.assertEqual(s, SlotStock('GOOG', 100, 490.1))
+        with self.assertRaises(ValueError):
+            SlotStock.from_row(['GOOG', '-100', '490.1'])
+
+    def test_validation(self):
+        s = SlotStock('GOOG', 100, 490.1)
+        with self.assertRaises(TypeError):
+            s.shares = '50'
+        with self.assertRaises(ValueError):
+            s.shares = -50
+        with self.assertRaises(AttributeError):
+            s.share = 100
+
+class TestValidated(unittest.TestCase):
+    def test_messages(self):
+        @validated
+        def add(x: Integer, y: Integer) -> Integer:
+            return x + y
+        self.assertEqual(add(2, 3), 5)
+        self.assertEqual(add(x=2, y=3), 5)
+        for args, kwargs in [(('a', 'b'), {}), (('a',), {'y': 'b'})]:
+            with self.assertRaises(TypeError) as cm:
+                add(*args, **kwargs)
+            self.assertEqual(str(cm.exception),
+                             "Bad Arguments\n  x: expected <class 'int'>\n  y: expected <class 'int'>")
+        with self.assertRaises(TypeError) as cm:
+            add(2, 3.5)
+        self.assertEqual(str(cm.exception), "Bad Arguments\n  y: expected <class 'int'>")
+
+    def test_enforce(self):
+        @enforce(x=Integer, return_=Integer)
+        def half(x):
+            return x / 2
+        with self.assertRaises(TypeError) as cm:
+            half(1.0)
+        self.assertEqual(str(cm.exception), "Bad Arguments\n    x: expected <class 'int'>")
+        with self.assertRaises(TypeError) as cm:
+            half(2)
+        self.assertEqual(str(cm.exception), "Bad return: expected <class 'int'>")
+
+    def test_method(self):
+        s = Stock('GOOG', 100, 490.1)
+        s.sell(25)
+        self.assertEqual(s.shares, 75)
+        with self.assertRaises(TypeError):
+            s.sell(-25)
+        self.assertEqual(Stock.sell.__name__, 'sell')
+
+class TestFlatCheck(unittest.TestCase):
+    def test_same_as_check(self):
+        for validator, values in [(PositiveInteger, [5, 0, -1, 2.5, 'a']),
+                                  (NonEmptyString, ['x', '', 3])]:
+            for value in values:
+                try:
+                    expected = validator.check(value)
+                except Exception as e:
+                    with self.assertRaises(type(e)) as cm:
+                        validator.flat_check(value)
+                    self.assertEqual(str(cm.exception), str(e))
+                else:
+                    self.assertEqual(validator.flat_check(value), expected)
+
+    def test_custom_check(self):
+        class Even(Validator):
+            @classmethod
+            def check(cls, value):
+                if value % 2:
+                    raise ValueError('must be even')
+                return super().check(value)
+        class EvenInteger(Integer, Even):
+            pass
+        self.assertEqual(EvenInteger.flat_check(4), 4)
+        with self.assertRaises(ValueError):
+            EvenInteger.flat_check(3)
+        with self.assertRaises(TypeError):
+            EvenInteger.flat_check(4.0)
+
+    def test_parameterised_check(self):
+        class Range(Validator):
+            def __init__(self, lo, hi, name=None):
+                super().__init__(name)
+                self.lo = lo
+                self.hi = hi
+            def check(self, value):
+                if not self.lo <= value <= self.hi:
+                    raise ValueError(f'must be in [{self.lo}, {self.hi}]')
+                return value
+        class Pixel(Structure):
+            _fields = ('x', 'y')
+            x = Range(0, 639)
+            y = Range(0, 479)
+        Pixel.create_init()
+        p = Pixel(10, 20)
+        p.x = 639
+        self.assertEqual((p.x, p.y), (639, 20))
+        with self.assertRaises(ValueError):
+            p.y = 480
+        with self.assertRaises(ValueError):
+            Pixel(700, 0)
+        self.assertEqual(Pixel.__dict__['x'].flat_check(5), 5)
+
+class TestValidationMode(unittest.TestCase):
+    def test_off(self):
+        with validation('off'):
+            self.assertEqual(get_validation(), 'off')
+            s = Stock('GOOG', -100, 490.1)
+            s.shares = '50'
+            self.assertEqual(s.shares, '50')
+            self.assertEqual(Stock.from_row(['GOOG', '-1', '2.5']).shares, -1)
+            with self.assertRaises(ValueError):
+                Stock.from_row(['GOOG', 'x', '2.5'])
+            with self.assertRaises(AttributeError):
+                s.share = 100
+        self.assertEqual(get_validation(), 'full')
+        with self.assertRaises(ValueError):
+            Stock('GOOG', -100, 490.1)
+
+    def test_sampled(self):
+        with validation('sampled:4'):
+            failures = 0
+            for n in range(8):
+                try:
+                    Stock.from_row(['GOOG', '-1', '2.5'])
+                except ValueError:
+                    failures += 1
+        self.assertEqual(failures, 2)
+
+    def test_sampled_init(self):
+        with validation('sampled:4'):
+            failures = 0
+            for n in range(8):
+                try:
+                    Stock('GOOG', -1, 2.5)
+                except ValueError:
+                    failures += 1
+        self.assertEqual(failures, 2)
+
+    def test_class_mode(self):
+        class Feed(Structure, validation='off'):
+            name = String()
+            price = PositiveFloat()
+        self.assertEqual(Feed.from_row(['x', '-2']).price, -2.0)
+        with validation('full'):
+            self.assertEqual(Feed('x', -2).price, -2)
+
+    def test_subclass_mode(self):
+        class Quiet(Structure, validation='off'):
+            shares = PositiveInteger()
+        class Strict(Quiet, validation='full'):
+            shares = PositiveInteger()
+        s = Strict(1)
+        with self.assertRaises(TypeError):
+            s.shares = 'bad'
+        with self.assertRaises(ValueError):
+            Strict(-1)
+        self.assertEqual(Quiet(-1).shares, -1)
+
+    def test_bad_mode(self):
+        with self.assertRaises(ValueError):
+            set_validation('sometimes')
+        self.assertEqual(get_validation(), 'full')
+
+class TestReader(unittest.TestCase):
+    def test_read_csv_as_instances(self):
+        port = read_csv_as_instances('../../Data/portfolio.csv', Stock)
+        self.assertEqual(len(port), 7)
+        self.assertEqual(port[0], Stock('AA', 100, 32.2))
+
+    def test_iter_csv_as_instances(self):
+        records = iter_csv_as_instances('../../Data/portfolio.csv', Stock)
+        self.assertEqual(next(records), Stock('AA', 100, 32.2))
+        self.assertEqual(list(records),
+                         read_csv_as_instances('../../Data/portfolio.csv', Stock)[1:])
+
+    def test_iter_csv_as_dicts(self):
+        records = list(iter_csv_as_dicts('../../Data/portfolio.csv', [str, int, float]))
+        self.assertEqual(records,
+                         read_csv_as_dicts('../../Data/portfolio.csv', [str, int, float]))
+
+    def test_iter_headers(self):
+        records = iter_csv_as_dicts('../../Data/portfolio_noheader.csv', [str, int, float],
+                                    headers=['name', 'shares', 'price'])
+        self.assertEqual(next(records), {'name': 'AA', 'shares': 100, 'price': 32.2})
+
+    def test_iter_bad_rows(self):
+        with self.assertLogs('structly.reader', level='WARNING') as cm:
+            records = list(iter_csv_as_dicts('../../Data/missing.csv', [str, int, float]))
+        self.assertTrue(records)
+        self.assertIn('Bad row', cm.output[0])
+
+    def test_read_csv_parallel(self):
+        port = read_csv_as_instances('../../Data/portfolio.csv', Stock)
+        self.assertEqual(read_csv_parallel('../../Data/portfolio.csv', Stock, workers=2), port)
+        cols = read_csv_parallel('../../Data/portfolio.csv', Stock, workers=2, as_columns=True)
+        self.assertEqual([tuple(row) for row in cols], [tuple(s) for s in port])
+
+    def test_read_csv_parallel_bad_rows(self):
+        with self.assertLogs('structly.reader', level='WARNING') as serial:
+            read_csv_as_instances('../../Data/missing.csv', Stock)
+        with self.assertLogs('structly.reader', level='WARNING') as parallel:
+            read_csv_parallel('../../Data/missing.csv', Stock, workers=2)
+        self.assertEqual(serial.output, parallel.output)
+
+class TestColumns(unittest.TestCase):
+    def test_read_csv_as_columns(self):
+        cols = read_csv_as_columns('../../Data/portfolio.csv', Stock)
+        port = read_csv_as_instances('../../Data/portfolio.csv', Stock)
+        self.assertEqual(len(cols), len(port))
+        self.assertEqual([tuple(row) for row in cols], [tuple(s) for s in port])
+        self.assertEqual(cols[-1].name, 'IBM')
+        self.assertEqual(cols.column('shares').typecode, 'q')
+        self.assertEqual(cols.instance(0), port[0])
+
+    def test_slice(self):
+        cols = read_csv_as_columns('../../Data/portfolio.csv', Stock)
+        self.assertEqual(len(cols[2:4]), 2)
+        self.assertEqual(cols[2:4][0], cols[2])
+
+    def test_bad_rows(self):
+        with self.assertLogs('structly.reader', level='WARNING'):
+            cols = read_csv_as_columns('../../Data/missing.csv', Stock)
+        self.assertTrue(len(cols))
+
+    def test_short_row(self):
+        lines = ['name,shares,price', 'AA,100,32.2', 'BB,50', 'CC,10,1.5']
+        with self.assertLogs('structly.reader', level='WARNING'):
+            cols = csv_as_columns(lines, Stock)
+        self.assertEqual(len(cols), 2)
+        self.assertEqual(len(cols.column('price')), 2)
+        self.assertEqual(cols[1].price, 1.5)
+        with tempfile.NamedTemporaryFile('w', suffix='.csv') as f:
+            f.write('\n'.join(lines) + '\n')
+            f.flush()
+            with self.assertLogs('structly.reader', level='WARNING'):
+                parallel = read_csv_parallel(f.name, Stock, workers=2, as_columns=True)
+        self.assertEqual(list(parallel), list(cols))
+        with self.assertRaises(ValueError):
+            cols.append(['DD', 10])
+        self.assertEqual(len(cols.column('name')), 2)
+
+    def test_bad_attribute(self):
+        cols = read_csv_as_columns('../../Data/portfolio.csv', Stock)
+        with self.assertRaises(AttributeError):
+            cols[0].share
+
+class TestTableFormat(unittest.TestCase):
+    def setUp(self):
+        self.port = read_csv_as_instances('../../Data/portfolio.csv', Stock)
+
+    def test_file(self):
+        out = io.StringIO()
+        print_table(self.port[:2], ['name', 'shares'], create_formatter('csv', file=out))
+        self.assertEqual(out.getvalue(), 'name,shares\nAA,100\nIBM,50\n')
+
+    def test_html(self):
+        out = io.StringIO()
+        print_table(self.port[:1], ['name', 'shares'], create_formatter('html', file=out))
+        self.assertEqual(out.getvalue(),
+                         '<tr> <th>name</th> <th>shares</th> </tr>\n'
+                         '<tr> <td>AA</td> <td>100</td> </tr>\n')
+
+    def test_column_formats(self):
+        for formats in (['%s', '%d', '%0.2f'], ['%-6s', '%05d', '[%s]']):
+            compiled = io.StringIO()
+            formatter = create_formatter('text', formats, file=compiled)
+            print_table(self.port, ['name', 'shares', 'price'], formatter)
+
+            # Same table one cell at a time through row()
+            expected = io.StringIO()
+            formatter = create_formatter('text', formats, file=expected)
+            formatter.headings(['name', 'shares', 'price'])
+            for s in self.port:
+                formatter.row([s.name, s.shares, s.price])
+            formatter.flush()
+            self.assertEqual(compiled.getvalue(), expected.getvalue())
+
+    def test_row_override(self):
+        # Defining the subclass registers it as a format, so put the
+        # registry back afterwards
+        with mock.patch.dict(TableFormatter._formats):
+            class QuotedCSVFormatter(type(create_formatter('csv'))):
+                def row(self, rowdata):
+                    self.write(','.join(f'"{d}"' for d in rowdata))
+            name = QuotedCSVFormatter.__module__.split('.')[-1]
+            for quoted in (QuotedCSVFormatter(file=io.StringIO()),
+                           create_formatter(name, ['%s', '%d'], file=io.StringIO())):
+                print_table(self.port[:1], ['name', 'shares'], quoted)
+                self.assertEqual(quoted.file.getvalue(), 'name,shares\n"AA","100"\n')
+            formatter._formatter_class.cache_clear()
+
+    def test_flushsize(self):
+        out = io.StringIO()
+        formatter = create_formatter('tsv', file=out, flushsize=2)
+        formatter.headings(['name', 'shares'])
+        self.assertEqual(out.getvalue(), '')
+        formatter.row(['AA', 100])
+        self.assertEqual(out.getvalue(), 'name\tshares\nAA\t100\n')
+        formatter.row(['IBM', 50])
+        formatter.flush()
+        self.assertEqual(out.getvalue(), 'name\tshares\nAA\t100\nIBM\t50\n')
+
+    def test_unbuffered(self):
+        out = io.StringIO()
+        formatter = create_formatter('csv', file=out)
+        formatter.headings(['name', 'shares'])
+        self.assertEqual(out.getvalue(), 'name,shares\n')
+        print_table(self.port[:1], ['name', 'shares'], formatter)
+        self.assertIsNone(formatter.flushsize)
+        self.assertEqual(out.getvalue(), 'name,shares\nname,shares\nAA,100\n')
+
+    def test_with(self):
+        out = io.StringIO()
+        with create_formatter('csv', file=out, flushsize=100) as formatter:
+            formatter.headings(['name', 'shares'])
+            formatter.row(['AA', 100])
+            self.assertEqual(out.getvalue(), '')
+        self.assertEqual(out.getvalue(), 'name,shares\nAA,100\n')
+
+class PipeTableFormatter(TableFormatter):
+    def headings(self, headers):
+        self.write('|'.join(headers))
+    def row(self, rowdata):
+        self.write('|'.join(map(str, rowdata)))
+
+class TestFormatRegistry(unittest.TestCase):
+    def test_available(self):
+        self.assertTrue({'text', 'csv', 'html', 'tsv'} <= set(available_formats()))
+
+    def test_cached_class(self):
+        a = create_formatter('csv', ['%s', '%d'], upper_headers=True)
+        b = create_formatter('csv', ['%s', '%d'], upper_headers=True)
+        self.assertIs(type(a), type(b))
+        self.assertIsNot(a, b)
+
+    def test_unknown(self):
+        with self.assertRaises(RuntimeError):
+            create_formatter('nosuchformat')
+
+    def test_entry_point(self):
+        ep = EntryPoint('pipe', 'teststructly:PipeTableFormatter', formatter.ENTRY_POINT_GROUP)
+        with mock.patch.object(formatter, 'entry_points', return_value=[ep]):
+            formatter._plugin_formats.cache_clear()
+            try:
+                self.assertIn('pipe', available_formats())
+                out = io.StringIO()
+                print_table(read_csv_as_instances('../../Data/portfolio.csv', Stock)[:1],
+                            ['name', 'shares'], create_formatter('pipe', file=out))
+                self.assertEqual(out.getvalue(), 'name|shares\nAA|100\n')
+            finally:
+                formatter._plugin_formats.cache_clear()
+
+    def test_entry_point_module(self):
+        # Naming a module registers the formatter it defines (here
+        # PipeTableFormatter in this module) under the entry point name
+        ep = EntryPoint('pipemod', 'teststructly', formatter.ENTRY_POINT_GROUP)
+        with mock.patch.object(formatter, 'entry_points', return_value=[ep]):
+            formatter._plugin_formats.cache_clear()
+            try:
+                self.assertIn('pipemod', available_formats())
+                self.assertEqual(type(create_formatter('pipemod')).__name__, 'PipeTableFormatter')
+            finally:
+                formatter._plugin_formats.cache_clear()
+                TableFormatter._formats.pop('pipemod', None)
+
+if __name__ == '__main__':
+    unittest.main()